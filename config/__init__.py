@@ -1,5 +1,5 @@
-from config.settings import Settings
+from config.settings import Settings, get_settings
 
-settings = Settings()
+settings = get_settings()
 
-__all__ = ["settings", "Settings"]
+__all__ = ["settings", "Settings", "get_settings"]
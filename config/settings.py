@@ -3,20 +3,23 @@ Configuración centralizada del Chatbot LSE-FIUBA.
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings
 
+_ROOT = Path(__file__).resolve().parent.parent
+
 
 class Settings(BaseSettings):
     """Configuración del sistema cargada desde .env"""
 
     # ── Rutas ──────────────────────────────────────────────
-    PROJECT_ROOT: Path = Path(__file__).resolve().parent.parent
-    RAW_DATA_DIR: Path = Path(__file__).resolve().parent.parent / "data" / "raw"
-    PROCESSED_DATA_DIR: Path = Path(__file__).resolve().parent.parent / "data" / "processed"
-    INDEX_DIR: Path = Path(__file__).resolve().parent.parent / "data" / "indexes"
-    GRAPH_DIR: Path = Path(__file__).resolve().parent.parent / "data" / "graphs"
-    EVALUATION_DIR: Path = Path(__file__).resolve().parent.parent / "data" / "evaluation"
+    PROJECT_ROOT: Path = _ROOT
+    RAW_DATA_DIR: Path = _ROOT / "data" / "raw"
+    PROCESSED_DATA_DIR: Path = _ROOT / "data" / "processed"
+    INDEX_DIR: Path = _ROOT / "data" / "indexes"
+    GRAPH_DIR: Path = _ROOT / "data" / "graphs"
+    EVALUATION_DIR: Path = _ROOT / "data" / "evaluation"
 
     # ── LLM ────────────────────────────────────────────────
     LLM_BACKEND: str = "ollama"
@@ -48,16 +51,22 @@ class Settings(BaseSettings):
     HYDE_ALPHA: float = 0.6
     MAX_QUERY_EXPANSIONS: int = 3
 
+    # ── Semantic Cache ──────────────────────────────────────
+    USE_SEMANTIC_CACHE: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 10000
+
     # ── Conversation ────────────────────────────────────────
     CONVERSATION_WINDOW_SIZE: int = 6
     MAX_SUMMARY_LENGTH: int = 500
 
     # ── Feedback ────────────────────────────────────────────
-    FEEDBACK_STORAGE_PATH: str = "data/evaluation/feedback.json"
+    FEEDBACK_STORAGE_PATH: str = "data/evaluation/feedback.jsonl"
 
     # ── API ────────────────────────────────────────────────
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    API_THREADPOOL_SIZE: int = 40  # hilos de anyio para llamadas bloqueantes
 
     # ── UI ─────────────────────────────────────────────────
     STREAMLIT_PORT: int = 8501
@@ -67,3 +76,12 @@ class Settings(BaseSettings):
         "env_file_encoding": "utf-8",
         "extra": "ignore",
     }
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Retorna la instancia única de Settings (el .env se parsea una sola vez).
+
+    En tests se puede forzar la relectura con ``get_settings.cache_clear()``.
+    """
+    return Settings()
@@ -19,10 +19,6 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(name)-30s | %(levelname)-7s | %(message)s",
-)
 logger = logging.getLogger("api")
 
 
@@ -37,6 +33,11 @@ def parse_args():
 def main():
     args = parse_args()
 
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(name)-30s | %(levelname)-7s | %(message)s",
+    )
+
     logger.info("=" * 70)
     logger.info("API CHATBOT ADMINISTRATIVO LSE-FIUBA")
     logger.info("Autor: Juan Ruiz Otondo - CEIA FIUBA")
@@ -45,6 +46,7 @@ def main():
     logger.info(f"Docs: http://localhost:{args.port}/docs")
     logger.info("=" * 70)
 
+    # Último paso: uvicorn solo se importa con argumentos válidos
     import uvicorn
     uvicorn.run(
         "src.api.main:app",
@@ -10,6 +10,8 @@ Uso:
     python run_evaluation.py                    # Evaluación completa
     python run_evaluation.py --quick            # Subset rápido (5 preguntas)
     python run_evaluation.py --category factual # Solo preguntas factuales
+    python run_evaluation.py --workers 1        # Secuencial (tiempos sin contención)
+    python run_evaluation.py --no-ragas-cache   # Recalcular todas las métricas RAGAS
 """
 
 import sys
@@ -43,6 +45,14 @@ def parse_args():
         "--category", type=str, default=None,
         help="Evaluar solo una categoría (factual, procedural, comparative, etc.)",
     )
+    parser.add_argument(
+        "--workers", type=int, default=4,
+        help="Preguntas evaluadas en paralelo (1 = secuencial)",
+    )
+    parser.add_argument(
+        "--no-ragas-cache", action="store_true",
+        help="No reusar métricas RAGAS guardadas de corridas anteriores",
+    )
     return parser.parse_args()
 
 
@@ -54,17 +64,16 @@ def main():
     logger.info("Autor: Juan Ruiz Otondo - CEIA FIUBA")
     logger.info("=" * 70)
 
-    from config.settings import Settings
-    from src.api.dependencies import AppDependencies
+    from config.settings import get_settings
+    from src.api.dependencies import get_dependencies
     from src.evaluation.evaluator import Evaluator
     from src.evaluation.test_sets import EVALUATION_QA_PAIRS
 
     # Inicializar sistema
-    settings = Settings()
+    settings = get_settings()
     logger.info("Inicializando componentes del sistema...")
 
-    deps = AppDependencies()
-    deps.initialize()
+    deps = get_dependencies()
 
     # Filtrar preguntas
     qa_pairs = EVALUATION_QA_PAIRS
@@ -84,9 +93,10 @@ def main():
         hybrid_retriever=deps.hybrid_retriever,
         answer_synthesizer=deps.answer_synthesizer,
         output_dir=settings.EVALUATION_DIR,
+        use_ragas_cache=not args.no_ragas_cache,
     )
 
-    report = evaluator.evaluate(qa_pairs, verbose=True)
+    report = evaluator.evaluate(qa_pairs, verbose=True, max_workers=args.workers)
 
     # Mostrar resumen
     summary = evaluator.print_summary(report)
@@ -12,24 +12,20 @@ Uso:
     python run_pipeline.py --doc CEIA.pdf       # Procesar un documento
 """
 
+import os
 import sys
 import argparse
 import logging
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # Configurar path
 ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT))
 
-from config.settings import Settings
-from src.data_pipeline.pipeline_orchestrator import PipelineOrchestrator
-from src.rag.embeddings import EmbeddingModel
-from src.rag.vector_store import FAISSVectorStore
-from src.graph_rag.entity_extractor import AcademicEntityExtractor
-from src.graph_rag.relationship_mapper import RelationshipMapper
-from src.graph_rag.graph_builder import KnowledgeGraphBuilder
-from src.graph_rag.community_detector import CommunityDetector
+from config.settings import get_settings
 
 # Logging
 logging.basicConfig(
@@ -43,6 +39,29 @@ logging.basicConfig(
 logger = logging.getLogger("pipeline")
 
 
+@lru_cache(maxsize=1)
+def _get_entity_extractor():
+    """Extractor de entidades propio de cada proceso worker."""
+    from src.graph_rag.entity_extractor import AcademicEntityExtractor
+    return AcademicEntityExtractor()
+
+
+def _extract_worker(item: tuple[str, str]) -> list:
+    text, document_name = item
+    return _get_entity_extractor().extract_entities(text, document_name)
+
+
+def _list_pdfs(directory: Path) -> list[Path]:
+    """Lista los PDFs de un directorio con os.scandir (sin stat() por archivo)."""
+    with os.scandir(directory) as entries:
+        return [
+            Path(entry.path)
+            for entry in entries
+            if entry.name.lower().endswith(".pdf")
+            and entry.is_file(follow_symlinks=False)
+        ]
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Pipeline de procesamiento de documentos LSE-FIUBA"
@@ -68,7 +87,13 @@ def parse_args():
 
 def main():
     args = parse_args()
-    settings = Settings()
+
+    # Imports diferidos: `--help` y los errores tempranos no cargan torch/faiss
+    from src.data_pipeline.pipeline_orchestrator import PipelineOrchestrator
+    from src.rag.embeddings import EmbeddingModel
+    from src.rag.vector_store import FAISSVectorStore
+
+    settings = get_settings()
 
     logger.info("=" * 70)
     logger.info("PIPELINE DE PROCESAMIENTO - CHATBOT LSE-FIUBA")
@@ -87,15 +112,19 @@ def main():
     # ── 2. Copiar PDFs al directorio raw si no existen ───────────
     # Buscar PDFs en el directorio padre (donde están los originales)
     source_pdf_dir = ROOT.parent  # Directorio DOCUMENTOS CHATBOT
-    pdf_files = list(source_pdf_dir.glob("*.pdf"))
+    pdf_files = _list_pdfs(source_pdf_dir)
 
-    if pdf_files and not list(raw_dir.glob("*.pdf")):
+    if pdf_files and not _list_pdfs(raw_dir):
         logger.info(f"Copiando {len(pdf_files)} PDFs desde {source_pdf_dir}")
         for pdf in pdf_files:
             dest = raw_dir / pdf.name
             if not dest.exists():
-                shutil.copy2(pdf, dest)
-                logger.info(f"  Copiado: {pdf.name}")
+                # Hardlink si es el mismo filesystem (no copia bytes)
+                try:
+                    os.link(pdf, dest)
+                except OSError:
+                    shutil.copy2(pdf, dest)
+                logger.info("  Copiado: %s", pdf.name)
 
     # ── 3. Pipeline de extracción y procesamiento ────────────────
     logger.info("\n--- Etapa 1: Extracción y procesamiento de PDFs ---")
@@ -111,11 +140,11 @@ def main():
             logger.error(f"Documento no encontrado: {doc_path}")
             sys.exit(1)
         # Procesar un solo documento
-        chunks = pipeline.process_single(doc_path)
+        chunks = pipeline.process_single(doc_path, force=args.force)
         all_chunks = pipeline.get_all_chunks()
         logger.info(f"Documento procesado: {len(chunks)} chunks nuevos")
     else:
-        pdfs = list(raw_dir.glob("*.pdf"))
+        pdfs = _list_pdfs(raw_dir)
         if not pdfs:
             logger.error(f"No se encontraron PDFs en {raw_dir}")
             logger.info(f"Colocá los documentos PDF en: {raw_dir}")
@@ -149,7 +178,9 @@ def main():
     # Generar embeddings
     texts = [chunk.text for chunk in all_chunks]
     logger.info(f"Generando embeddings para {len(texts)} chunks...")
-    embeddings = embedding_model.embed_texts(texts)
+    embeddings = embedding_model.embed_texts(
+        texts, batch_size=128, show_progress_bar=True
+    )
 
     # Construir índice
     logger.info("Construyendo índice FAISS...")
@@ -158,40 +189,42 @@ def main():
     logger.info(f"Guardando índice en {index_dir}...")
     vector_store.save(index_dir)
 
-    logger.info(f"Índice FAISS creado con {vector_store.index.ntotal} vectores")
+    n_vectors = vector_store.index.ntotal
+    logger.info(f"Índice FAISS creado con {n_vectors} vectores")
 
     # ── 5. Grafo de conocimiento ─────────────────────────────────
     if not args.skip_graph:
         logger.info("\n--- Etapa 3: Construcción del grafo de conocimiento ---")
 
-        entity_extractor = AcademicEntityExtractor()
+        from src.graph_rag.relationship_mapper import RelationshipMapper
+        from src.graph_rag.graph_builder import KnowledgeGraphBuilder
+        from src.graph_rag.community_detector import CommunityDetector
+
         relationship_mapper = RelationshipMapper()
         graph_builder = KnowledgeGraphBuilder()
 
-        # Extraer entidades de cada chunk
-        all_entities = []
-        for chunk in all_chunks:
-            entities = entity_extractor.extract_entities(
-                chunk.text, chunk.document_name
+        # Extraer entidades de cada chunk (en paralelo, CPU-bound)
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = executor.map(
+                _extract_worker,
+                ((c.text, c.document_name) for c in all_chunks),
+                chunksize=32,
             )
-            all_entities.extend(entities)
+            all_entities = [e for entities in results for e in entities]
 
         logger.info(f"Entidades extraídas: {len(all_entities)}")
 
-        # Mapear relaciones
-        full_text = "\n\n".join(c.text for c in all_chunks)
-        all_relationships = relationship_mapper.extract_relationships(
-            text=full_text,
-            entities=all_entities,
+        # Mapear relaciones (chunk por chunk, sin concatenar el corpus)
+        all_relationships = list(
+            relationship_mapper.extract_relationships_iter(all_chunks, all_entities)
         )
         logger.info(f"Relaciones mapeadas: {len(all_relationships)}")
 
         # Construir grafo
         graph_builder.build_graph(all_entities, all_relationships)
-        logger.info(
-            f"Grafo construido: {graph_builder.graph.number_of_nodes()} nodos, "
-            f"{graph_builder.graph.number_of_edges()} aristas"
-        )
+        n_nodes = graph_builder.graph.number_of_nodes()
+        n_edges = graph_builder.graph.number_of_edges()
+        logger.info(f"Grafo construido: {n_nodes} nodos, {n_edges} aristas")
 
         # Detección de comunidades
         try:
@@ -209,10 +242,10 @@ def main():
     logger.info("\n" + "=" * 70)
     logger.info("PIPELINE COMPLETADO EXITOSAMENTE")
     logger.info(f"  Chunks disponibles: {len(all_chunks)}")
-    logger.info(f"  Vectores indexados: {vector_store.index.ntotal}")
+    logger.info(f"  Vectores indexados: {n_vectors}")
     if not args.skip_graph:
-        logger.info(f"  Nodos del grafo: {graph_builder.graph.number_of_nodes()}")
-        logger.info(f"  Aristas del grafo: {graph_builder.graph.number_of_edges()}")
+        logger.info(f"  Nodos del grafo: {n_nodes}")
+        logger.info(f"  Aristas del grafo: {n_edges}")
     logger.info("=" * 70)
     logger.info("\nSiguiente paso: ejecutar la API con 'python run_api.py'")
 
@@ -5,36 +5,49 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
 import logging
+import threading
 from pathlib import Path
-from functools import lru_cache
-
-from config.settings import Settings
-from src.rag.embeddings import EmbeddingModel
-from src.rag.vector_store import FAISSVectorStore
-from src.rag.retriever import RAGRetriever, CrossEncoderReranker
-from src.rag.rag_chain import RAGChain
-from src.graph_rag.entity_extractor import AcademicEntityExtractor
-from src.graph_rag.graph_builder import KnowledgeGraphBuilder
-from src.graph_rag.graph_retriever import GraphRetriever
-from src.hybrid.hybrid_retriever import HybridRetriever
-from src.hybrid.answer_synthesizer import AnswerSynthesizer
-from src.hybrid.anti_hallucination import AntiHallucinationEngine
-from src.hybrid.citation_manager import CitationManager
-from src.hybrid.conversation_memory import ConversationMemory
-from src.llm.llm_provider import LLMProvider
-from src.rag.query_expansion import QueryExpander
-from src.rag.hyde import HyDERetriever
-from src.evaluation.feedback import FeedbackCollector
-from src.data_pipeline.pipeline_orchestrator import PipelineOrchestrator
+from typing import TYPE_CHECKING, Callable, Optional
+
+from config.settings import Settings, get_settings
+
+# Los subsistemas pesados (FAISS, sentence-transformers, networkx, LLM) se
+# importan dentro de initialize() para que importar este módulo sea barato.
+if TYPE_CHECKING:
+    from src.rag.embeddings import EmbeddingModel
+    from src.rag.vector_store import FAISSVectorStore
+    from src.rag.retriever import RAGRetriever, CrossEncoderReranker
+    from src.rag.rag_chain import RAGChain
+    from src.graph_rag.graph_builder import KnowledgeGraphBuilder
+    from src.graph_rag.graph_retriever import GraphRetriever
+    from src.hybrid.hybrid_retriever import HybridRetriever
+    from src.hybrid.answer_synthesizer import AnswerSynthesizer
+    from src.hybrid.conversation_memory import ConversationMemory
+    from src.hybrid.semantic_cache import SemanticCache
+    from src.llm.llm_provider import LLMProvider
+    from src.rag.query_expansion import QueryExpander
+    from src.rag.hyde import HyDERetriever
+    from src.evaluation.feedback import FeedbackCollector
+    from src.data_pipeline.pipeline_orchestrator import PipelineOrchestrator
 
 logger = logging.getLogger(__name__)
 
+def _file_key(path: Path) -> Optional[tuple]:
+    """(ruta, mtime_ns, tamaño) de un archivo, o None si no existe."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
 
 class AppDependencies:
     """Contenedor de todas las dependencias del sistema."""
 
     def __init__(self):
-        self.settings: Settings = Settings()
+        self.settings: Settings = get_settings()
+        self._index_path: Path = self.settings.INDEX_DIR / "faiss_index.bin"
+        self._graph_path: Path = self.settings.GRAPH_DIR / "knowledge_graph.pkl"
         self.embedding_model: EmbeddingModel = None
         self.vector_store: FAISSVectorStore = None
         self.rag_retriever: RAGRetriever = None
@@ -45,12 +58,26 @@ class AppDependencies:
         self.answer_synthesizer: AnswerSynthesizer = None
         self.llm_provider: LLMProvider = None
         self.pipeline: PipelineOrchestrator = None
-        self.query_expander: QueryExpander = None
-        self.hyde_retriever: HyDERetriever = None
-        self.conversation_memory: ConversationMemory = None
-        self.feedback_collector: FeedbackCollector = None
+        # (ruta, mtime_ns, tamaño) del índice FAISS y del grafo cargados
+        self.index_key: Optional[tuple] = None
         self._initialized = False
 
+        # Subsistemas opcionales: se construyen en el primer acceso
+        self._reranker: Optional[CrossEncoderReranker] = None
+        self._query_expander: Optional[QueryExpander] = None
+        self._hyde_retriever: Optional[HyDERetriever] = None
+        self._conversation_memory: Optional[ConversationMemory] = None
+        self._feedback_collector: Optional[FeedbackCollector] = None
+        self._semantic_cache: Optional[SemanticCache] = None
+        self._lazy_locks: dict[str, threading.Lock] = {
+            name: threading.Lock()
+            for name in (
+                "_query_expander", "_hyde_retriever",
+                "_conversation_memory", "_feedback_collector",
+                "_semantic_cache",
+            )
+        }
+
     def initialize(self) -> None:
         """Inicializa todos los componentes."""
         if self._initialized:
@@ -58,6 +85,20 @@ class AppDependencies:
 
         logger.info("Inicializando componentes del sistema...")
 
+        from src.llm.llm_provider import LLMProvider
+        from src.rag.embeddings import EmbeddingModel
+        from src.rag.vector_store import FAISSVectorStore
+        from src.rag.retriever import RAGRetriever, CrossEncoderReranker
+        from src.rag.rag_chain import RAGChain
+        from src.graph_rag.entity_extractor import AcademicEntityExtractor
+        from src.graph_rag.graph_builder import KnowledgeGraphBuilder
+        from src.graph_rag.graph_retriever import GraphRetriever
+        from src.hybrid.hybrid_retriever import HybridRetriever
+        from src.hybrid.answer_synthesizer import AnswerSynthesizer
+        from src.hybrid.anti_hallucination import AntiHallucinationEngine
+        from src.hybrid.citation_manager import CitationManager
+        from src.data_pipeline.pipeline_orchestrator import PipelineOrchestrator
+
         # LLM
         self.llm_provider = LLMProvider(
             backend=self.settings.LLM_BACKEND,
@@ -74,15 +115,11 @@ class AppDependencies:
             device=self.settings.EMBEDDING_DEVICE,
         )
 
-        # Vector Store
-        self.vector_store = FAISSVectorStore(
-            embedding_dim=384,
-            index_path=self.settings.INDEX_DIR,
-        )
-
-        # Intentar cargar índice existente
-        if (self.settings.INDEX_DIR / "faiss_index.bin").exists():
-            self.vector_store.load(self.settings.INDEX_DIR)
+        # Vector Store (el índice se carga una sola vez)
+        index_key = _file_key(self._index_path)
+        self.vector_store = FAISSVectorStore(embedding_dim=384)
+        if index_key is not None:
+            self.vector_store.load(self._index_path.parent)
 
         # RAG Retriever
         reranker = None
@@ -91,6 +128,7 @@ class AppDependencies:
                 reranker = CrossEncoderReranker()
             except Exception as e:
                 logger.warning(f"No se pudo cargar cross-encoder reranker: {e}")
+        self._reranker = reranker
 
         self.rag_retriever = RAGRetriever(
             embedding_model=self.embedding_model,
@@ -106,9 +144,12 @@ class AppDependencies:
         )
 
         # Graph
+        graph_key = _file_key(self._graph_path)
         self.graph_builder = KnowledgeGraphBuilder()
-        if (self.settings.GRAPH_DIR / "knowledge_graph.pkl").exists():
-            self.graph_builder.load(self.settings.GRAPH_DIR)
+        if graph_key is not None:
+            self.graph_builder.load(self._graph_path.parent)
+
+        self.index_key = (index_key, graph_key)
 
         entity_extractor = AcademicEntityExtractor()
         self.graph_retriever = GraphRetriever(
@@ -137,54 +178,109 @@ class AppDependencies:
             citation_manager=CitationManager(),
         )
 
-        # Query Expander
-        if self.settings.USE_QUERY_EXPANSION:
-            self.query_expander = QueryExpander(
+        # Pipeline
+        self.pipeline = PipelineOrchestrator(
+            raw_dir=self.settings.RAW_DATA_DIR,
+            processed_dir=self.settings.PROCESSED_DATA_DIR,
+        )
+
+        self._initialized = True
+        logger.info("Sistema inicializado correctamente")
+
+    # ── Subsistemas opcionales (lazy) ──────────────────────────
+
+    def _get_lazy(self, attr: str, factory: Callable[[], object]):
+        """Construye el componente `attr` en el primer acceso (double-checked)."""
+        value = getattr(self, attr)
+        if value is None:
+            with self._lazy_locks[attr]:
+                value = getattr(self, attr)
+                if value is None:
+                    value = factory()
+                    setattr(self, attr, value)
+        return value
+
+    @property
+    def query_expander(self) -> Optional["QueryExpander"]:
+        if not self.settings.USE_QUERY_EXPANSION:
+            return None
+
+        def build():
+            from src.rag.query_expansion import QueryExpander
+            return QueryExpander(
                 llm_provider=self.llm_provider,
                 embedding_model=self.embedding_model,
                 max_expansions=self.settings.MAX_QUERY_EXPANSIONS,
             )
 
-        # HyDE Retriever
-        if self.settings.USE_HYDE:
-            self.hyde_retriever = HyDERetriever(
+        return self._get_lazy("_query_expander", build)
+
+    @property
+    def hyde_retriever(self) -> Optional["HyDERetriever"]:
+        if not self.settings.USE_HYDE:
+            return None
+
+        def build():
+            from src.rag.hyde import HyDERetriever
+            return HyDERetriever(
                 llm_provider=self.llm_provider,
                 embedding_model=self.embedding_model,
                 vector_store=self.vector_store,
-                reranker=reranker,
+                reranker=self._reranker,
                 alpha=self.settings.HYDE_ALPHA,
             )
 
-        # Conversation Memory
-        self.conversation_memory = ConversationMemory(
-            llm_provider=self.llm_provider,
-            window_size=self.settings.CONVERSATION_WINDOW_SIZE,
-            max_summary_length=self.settings.MAX_SUMMARY_LENGTH,
-        )
+        return self._get_lazy("_hyde_retriever", build)
 
-        # Feedback Collector
-        self.feedback_collector = FeedbackCollector(
-            storage_path=Path(self.settings.FEEDBACK_STORAGE_PATH),
-        )
+    @property
+    def semantic_cache(self) -> Optional["SemanticCache"]:
+        if not self.settings.USE_SEMANTIC_CACHE:
+            return None
 
-        # Pipeline
-        self.pipeline = PipelineOrchestrator(
-            raw_dir=self.settings.RAW_DATA_DIR,
-            processed_dir=self.settings.PROCESSED_DATA_DIR,
-        )
+        def build():
+            from src.hybrid.semantic_cache import SemanticCache
+            return SemanticCache(
+                threshold=self.settings.SEMANTIC_CACHE_THRESHOLD,
+                max_entries=self.settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            )
 
-        self._initialized = True
-        logger.info("Sistema inicializado correctamente")
+        return self._get_lazy("_semantic_cache", build)
+
+    @property
+    def conversation_memory(self) -> "ConversationMemory":
+        def build():
+            from src.hybrid.conversation_memory import ConversationMemory
+            return ConversationMemory(
+                llm_provider=self.llm_provider,
+                window_size=self.settings.CONVERSATION_WINDOW_SIZE,
+                max_summary_length=self.settings.MAX_SUMMARY_LENGTH,
+            )
+
+        return self._get_lazy("_conversation_memory", build)
+
+    @property
+    def feedback_collector(self) -> "FeedbackCollector":
+        def build():
+            from src.evaluation.feedback import FeedbackCollector
+            return FeedbackCollector(
+                storage_path=Path(self.settings.FEEDBACK_STORAGE_PATH),
+            )
+
+        return self._get_lazy("_feedback_collector", build)
 
 
 # Singleton
 _deps: AppDependencies = None
+_deps_lock = threading.Lock()
 
 
 def get_dependencies() -> AppDependencies:
-    """Obtiene la instancia singleton de dependencias."""
+    """Obtiene la instancia singleton de dependencias (thread-safe)."""
     global _deps
     if _deps is None:
-        _deps = AppDependencies()
-        _deps.initialize()
+        with _deps_lock:
+            if _deps is None:
+                deps = AppDependencies()
+                deps.initialize()
+                _deps = deps
     return _deps
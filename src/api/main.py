@@ -5,9 +5,13 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
 import logging
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from config.settings import get_settings
 from src.api.routes import chat, health
 
 # Configurar logging
@@ -16,6 +20,16 @@ logging.basicConfig(
     format="%(asctime)s | %(name)s | %(levelname)s | %(message)s",
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los endpoints delegan retrieval/LLM al thread pool de anyio
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = get_settings().API_THREADPOOL_SIZE
+    health.init_health_state(app)
+    yield
+
+
 app = FastAPI(
     title="Chatbot Administrativo LSE-FIUBA",
     description=(
@@ -24,6 +38,7 @@ app = FastAPI(
         "Trabajo Final de Juan Ruiz Otondo, CEIA."
     ),
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS
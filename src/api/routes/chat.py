@@ -5,10 +5,15 @@ Incluye memoria conversacional, query expansion y feedback.
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
+import asyncio
+import functools
 import time
 import logging
 import uuid
+from typing import Optional
 
+import anyio
+import numpy as np
 from fastapi import APIRouter, Depends
 
 from src.api.schemas import (
@@ -18,6 +23,7 @@ from src.api.schemas import (
     RetrievalModeEnum,
 )
 from src.api.dependencies import AppDependencies, get_dependencies
+from src.hybrid.answer_synthesizer import FinalAnswer
 from src.hybrid.hybrid_retriever import RetrievalMode
 
 logger = logging.getLogger(__name__)
@@ -25,81 +31,166 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
 
-def _mode_to_retrieval(mode: RetrievalModeEnum) -> RetrievalMode:
-    mapping = {
-        RetrievalModeEnum.rag: RetrievalMode.RAG_ONLY,
-        RetrievalModeEnum.graph: RetrievalMode.GRAPH_ONLY,
-        RetrievalModeEnum.hybrid: RetrievalMode.HYBRID,
-    }
-    return mapping[mode]
+_MODE_MAP: dict[RetrievalModeEnum, RetrievalMode] = {
+    RetrievalModeEnum.rag: RetrievalMode.RAG_ONLY,
+    RetrievalModeEnum.graph: RetrievalMode.GRAPH_ONLY,
+    RetrievalModeEnum.hybrid: RetrievalMode.HYBRID,
+}
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(
-    request: ChatRequest,
-    deps: AppDependencies = Depends(get_dependencies),
-) -> ChatResponse:
-    """Endpoint principal de chat con memoria conversacional y query expansion."""
-    start = time.time()
+# Requests sin sesión en curso, por pregunta normalizada: los duplicados
+# concurrentes esperan el resultado del primero (single-flight)
+_INFLIGHT_MAX = 1024
+_inflight: dict[tuple, asyncio.Future] = {}
 
-    session_id = request.session_id or str(uuid.uuid4())
-    mode = _mode_to_retrieval(request.mode)
+
+async def _run_blocking(func, *args, **kwargs):
+    """Ejecuta una llamada bloqueante (FAISS, LLM, disco) en el thread pool
+    de anyio para no frenar el event loop."""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs))
+
+
+async def _single_flight(key: tuple, compute):
+    """Ejecuta `compute()` una sola vez por `key` entre requests concurrentes."""
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+    if len(_inflight) >= _INFLIGHT_MAX:
+        return await compute()
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await compute()
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # evita el warning si no había otros esperando
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
+
+def _is_cacheable(final: FinalAnswer) -> bool:
+    """No se cachean abstenciones ni errores del LLM."""
+    return final.confidence > 0 and not final.answer.startswith("[Error")
+
+
+async def _answer(
+    request: ChatRequest,
+    deps: AppDependencies,
+    session_id: str,
+    mode: RetrievalMode,
+    query_embedding: Optional[np.ndarray] = None,
+) -> FinalAnswer:
+    """Pipeline completo: contextualización, expansión, retrieval y síntesis.
+
+    `query_embedding` (de la pregunta original) se reutiliza en el retrieval.
+    """
     query = request.question
+    chat_history = None
 
-    # 1. Contextualizar query con memoria conversacional
+    # 1. Contextualizar query y obtener historial conversacional
     if deps.conversation_memory and request.session_id:
-        query = deps.conversation_memory.contextualize_query(session_id, query)
+        query, chat_history = await _run_blocking(
+            deps.conversation_memory.prepare_turn, session_id, query
+        )
 
     # 2. Query expansion (solo para RAG y Hybrid)
     expanded_query = query
     if deps.query_expander and mode != RetrievalMode.GRAPH_ONLY:
-        expansions = deps.query_expander.expand(query)
+        expansions = await _run_blocking(deps.query_expander.expand, query)
         if len(expansions) > 1:
-            logger.info(f"Query expandida: {expansions}")
+            logger.info("Query expandida: %s", expansions)
 
     # 3. Retrieve
-    hybrid_result = deps.hybrid_retriever.retrieve(
+    hybrid_result = await _run_blocking(
+        deps.hybrid_retriever.retrieve,
         query=query,
         mode=mode,
         top_k=5,
         program_filter=request.program_filter,
+        query_embedding=query_embedding if query == request.question else None,
     )
 
-    # 4. Obtener historial conversacional
-    chat_history = None
-    if deps.conversation_memory and request.session_id:
-        chat_history = deps.conversation_memory.get_chat_history(session_id)
-
-    # 5. Synthesize
-    final = deps.answer_synthesizer.synthesize(
+    # 4. Synthesize
+    return await _run_blocking(
+        deps.answer_synthesizer.synthesize,
         query=request.question,
         hybrid_result=hybrid_result,
         chat_history=chat_history,
     )
 
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    deps: AppDependencies = Depends(get_dependencies),
+) -> ChatResponse:
+    """Endpoint principal de chat con memoria conversacional y query expansion."""
+    start = time.time()
+
+    session_id = request.session_id or str(uuid.uuid4())
+    mode = _MODE_MAP[request.mode]
+
+    # 0. Caché semántica (solo preguntas sin historial conversacional)
+    # El embedding de la pregunta se calcula una vez y lo reutiliza el retriever
+    cache = deps.semantic_cache if not request.session_id else None
+    final = None
+    query_embedding = None
+    if cache is not None:
+        query_embedding = await _run_blocking(
+            deps.embedding_model.embed_query, request.question
+        )
+        final = cache.lookup(
+            query_embedding, mode.value, request.program_filter,
+            index_key=deps.index_key,
+        )
+
+    if final is None:
+        async def compute() -> FinalAnswer:
+            answer = await _answer(
+                request, deps, session_id, mode, query_embedding=query_embedding
+            )
+            if cache is not None and _is_cacheable(answer):
+                cache.insert(
+                    query_embedding, answer, mode.value, request.program_filter,
+                    index_key=deps.index_key,
+                )
+            return answer
+
+        if request.session_id:
+            final = await compute()
+        else:
+            key = (
+                " ".join(request.question.lower().split()),
+                mode,
+                request.program_filter,
+            )
+            final = await _single_flight(key, compute)
+
     elapsed_ms = (time.time() - start) * 1000
 
-    # 6. Registrar en memoria conversacional
+    # 5. Registrar en memoria conversacional (puede resumir con el LLM)
     if deps.conversation_memory:
-        deps.conversation_memory.add_turn(session_id, "user", request.question)
-        deps.conversation_memory.add_turn(
-            session_id, "assistant", final.answer,
+        await _run_blocking(
+            deps.conversation_memory.commit_turn,
+            session_id,
+            request.question,
+            final.answer,
             metadata={"confidence": final.confidence, "method": final.method},
         )
 
-    sources = [
-        SourceCitation(
-            document_name=s.get("document_name", ""),
-            page_numbers=s.get("page_numbers", []),
-            section_title=s.get("section_title", ""),
-            text_snippet=s.get("text_snippet", ""),
-            score=s.get("score", 0.0),
-            source_type=s.get("source_type", "rag"),
-        )
-        for s in final.sources
-    ]
+    # Las fuentes y la respuesta se arman con datos internos que ya tienen
+    # el esquema de api.schemas, así que se omite la validación de Pydantic
+    sources = [SourceCitation.model_construct(**s) for s in final.sources]
 
-    return ChatResponse(
+    return ChatResponse.model_construct(
         answer=final.answer,
         formatted_answer=final.formatted_answer,
         sources=sources,
@@ -116,56 +207,60 @@ async def compare(
     request: ComparisonRequest,
     deps: AppDependencies = Depends(get_dependencies),
 ) -> ComparisonResponse:
-    """Compara RAG vs GraphRAG vs Hybrid para la misma pregunta."""
-    results = {}
-
-    for mode_name, mode_enum in [
-        ("rag", RetrievalMode.RAG_ONLY),
-        ("graph", RetrievalMode.GRAPH_ONLY),
-        ("hybrid", RetrievalMode.HYBRID),
-    ]:
-        start = time.time()
-
-        hybrid_result = deps.hybrid_retriever.retrieve(
-            query=request.question,
-            mode=mode_enum,
+    """Compara RAG vs GraphRAG vs Hybrid para la misma pregunta.
+
+    La recuperación RAG y la del grafo se hacen una sola vez y se reutilizan
+    en los tres modos; las tres síntesis van al LLM en un único batch.
+    """
+    start = time.time()
+    retriever = deps.hybrid_retriever
+
+    rag_hits, graph_hits = await asyncio.gather(
+        _run_blocking(
+            retriever.retrieve_rag,
+            request.question,
             top_k=5,
             program_filter=request.program_filter,
-        )
+        ),
+        _run_blocking(retriever.retrieve_graph, request.question, top_k=5),
+    )
 
-        final = deps.answer_synthesizer.synthesize(
-            query=request.question,
-            hybrid_result=hybrid_result,
-        )
+    modes = {
+        "rag": RetrievalMode.RAG_ONLY,
+        "graph": RetrievalMode.GRAPH_ONLY,
+        "hybrid": RetrievalMode.HYBRID,
+    }
+    hybrid_results = [
+        retriever.fuse(request.question, rag_hits, graph_hits, mode=mode_enum)
+        for mode_enum in modes.values()
+    ]
 
-        elapsed_ms = (time.time() - start) * 1000
+    finals = await _run_blocking(
+        deps.answer_synthesizer.synthesize_batch,
+        request.question,
+        hybrid_results,
+    )
 
-        sources = [
-            SourceCitation(
-                document_name=s.get("document_name", ""),
-                page_numbers=s.get("page_numbers", []),
-                section_title=s.get("section_title", ""),
-                text_snippet=s.get("text_snippet", ""),
-                score=s.get("score", 0.0),
-            )
-            for s in final.sources
-        ]
+    elapsed_ms = (time.time() - start) * 1000
 
-        results[mode_name] = ChatResponse(
+    responses = {
+        mode_name: ChatResponse.model_construct(
             answer=final.answer,
             formatted_answer=final.formatted_answer,
-            sources=sources,
+            sources=[SourceCitation.model_construct(**s) for s in final.sources],
             confidence=final.confidence,
             method=mode_name,
             warnings=final.warnings,
             fallback_contacts=final.fallback_contacts,
             processing_time_ms=elapsed_ms,
         )
+        for mode_name, final in zip(modes, finals)
+    }
 
     return ComparisonResponse(
-        rag_answer=results["rag"],
-        graph_answer=results["graph"],
-        hybrid_answer=results["hybrid"],
+        rag_answer=responses["rag"],
+        graph_answer=responses["graph"],
+        hybrid_answer=responses["hybrid"],
     )
 
 
@@ -178,7 +273,8 @@ async def submit_feedback(
     deps: AppDependencies = Depends(get_dependencies),
 ) -> FeedbackResponse:
     """Registra feedback del usuario sobre una respuesta."""
-    entry = deps.feedback_collector.submit_feedback(
+    entry = await _run_blocking(
+        deps.feedback_collector.submit_feedback,
         session_id=request.session_id,
         question=request.question,
         answer=request.answer,
@@ -198,7 +294,7 @@ async def get_feedback_stats(
     deps: AppDependencies = Depends(get_dependencies),
 ) -> FeedbackStatsResponse:
     """Obtiene estadísticas agregadas del feedback."""
-    stats = deps.feedback_collector.get_stats()
+    stats = await _run_blocking(deps.feedback_collector.get_stats)
     return FeedbackStatsResponse(
         total_entries=stats.total_entries,
         avg_rating=stats.avg_rating,
@@ -4,37 +4,80 @@ Endpoints de salud y estado del sistema.
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
-from fastapi import APIRouter, Depends
+import asyncio
+import time
+
+import anyio
+from fastapi import APIRouter, Depends, FastAPI, Request
 
 from src.api.schemas import HealthResponse, GraphStats, DocumentInfo
 from src.api.dependencies import AppDependencies, get_dependencies
 
 router = APIRouter(prefix="/api/v1", tags=["system"])
 
+# El chequeo del LLM hace una generación completa: los sondeos frecuentes
+# (liveness, balanceadores) reutilizan el último resultado durante unos segundos
+_HEALTH_TTL_S = 2.0
+
+
+def init_health_state(app: FastAPI) -> None:
+    """Lock y último resultado de /health en `app.state` (dentro del event loop)."""
+    app.state.health_lock = asyncio.Lock()
+    # (instante, deps, respuesta) del último chequeo
+    app.state.health_cache = None
+
+
+async def _llm_available(deps: AppDependencies) -> bool:
+    if not deps.llm_provider:
+        return False
+    return await anyio.to_thread.run_sync(deps.llm_provider.is_available)
+
+
+async def _documents_loaded(deps: AppDependencies) -> int:
+    if not deps.pipeline:
+        return 0
+    return len(await anyio.to_thread.run_sync(deps.pipeline.get_all_metadata))
+
 
 @router.get("/health", response_model=HealthResponse)
-async def health(deps: AppDependencies = Depends(get_dependencies)):
+async def health(
+    request: Request, deps: AppDependencies = Depends(get_dependencies)
+):
     """Estado de salud del sistema."""
-    llm_ok = deps.llm_provider.is_available() if deps.llm_provider else False
-    index_size = (
-        deps.vector_store.index.ntotal
-        if deps.vector_store and deps.vector_store.index
-        else 0
-    )
-    graph_nodes = (
-        deps.graph_builder.graph.number_of_nodes()
-        if deps.graph_builder
-        else 0
-    )
-    docs = len(deps.pipeline.get_all_metadata()) if deps.pipeline else 0
-
-    return HealthResponse(
-        status="ok",
-        llm_available=llm_ok,
-        documents_loaded=docs,
-        index_size=index_size,
-        graph_nodes=graph_nodes,
-    )
+    state = request.app.state
+    if not hasattr(state, "health_lock"):
+        init_health_state(request.app)  # la app corre sin lifespan
+
+    async with state.health_lock:
+        if state.health_cache is not None:
+            cached_at, cached_deps, cached = state.health_cache
+            if cached_deps is deps and time.monotonic() - cached_at < _HEALTH_TTL_S:
+                return cached
+
+        # Chequeos bloqueantes (LLM y metadata en disco) en paralelo
+        llm_ok, docs = await asyncio.gather(
+            _llm_available(deps), _documents_loaded(deps)
+        )
+        index_size = (
+            deps.vector_store.index.ntotal
+            if deps.vector_store and deps.vector_store.index
+            else 0
+        )
+        graph_nodes = (
+            deps.graph_builder.graph.number_of_nodes()
+            if deps.graph_builder
+            else 0
+        )
+
+        response = HealthResponse(
+            status="ok",
+            llm_available=llm_ok,
+            documents_loaded=docs,
+            index_size=index_size,
+            graph_nodes=graph_nodes,
+        )
+        state.health_cache = (time.monotonic(), deps, response)
+        return response
 
 
 @router.get("/graph/stats", response_model=GraphStats)
@@ -47,13 +90,14 @@ async def graph_stats(deps: AppDependencies = Depends(get_dependencies)):
 @router.get("/documents", response_model=list[DocumentInfo])
 async def list_documents(deps: AppDependencies = Depends(get_dependencies)):
     """Lista los documentos procesados."""
-    metadata_list = deps.pipeline.get_all_metadata()
-    docs = []
-    for meta in metadata_list:
-        docs.append(DocumentInfo(
+    metadata_list = await anyio.to_thread.run_sync(deps.pipeline.get_all_metadata)
+    # La metadata la escribe el pipeline con estos tipos: sin validar de nuevo
+    return [
+        DocumentInfo.model_construct(
             filename=meta.get("filename", ""),
             document_type=meta.get("document_type", ""),
             program_codes=meta.get("program_codes", []),
             topics=meta.get("topics", []),
-        ))
-    return docs
+        )
+        for meta in metadata_list
+    ]
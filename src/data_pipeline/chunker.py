@@ -14,6 +14,41 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Abreviaturas cuyo punto no marca fin de oración (se protegen con "§")
+_ABBR_RE = re.compile(r"(Art|Inc|Dr|Ing|Esp|Mag)\.")
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-ZÁÉÍÓÚÑ¿¡])")
+_ABBR_RESTORE = str.maketrans("§", ".")
+
+# Cortes de sección para el chunking semántico
+_ARTICLE_RE = re.compile(r"\n(?=Art\.\s*\d+)")
+_HEADER_RE = re.compile(r"\n(?=[A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s]{5,}(?:\n|:))")
+_NUMBERED_RE = re.compile(r"\n(?=(?:[IVXLC]+\.|[0-9]+\.)\s+[A-ZÁÉÍÓÚÑ])")
+_ARTICLE_TITLE_RE = re.compile(r"(Art\.\s*\d+[^.]*\.?)")
+_SECTION_SPLIT_RES = {
+    "articles": _ARTICLE_RE,     # Art. N
+    "headers": _HEADER_RE,       # Títulos en mayúsculas
+    "numbered": _NUMBERED_RE,    # I., II., III. o 1., 2., 3.
+}
+_SEMANTIC_SPLIT_ORDER = ("articles", "headers", "numbered")
+# Cortes que se prueban primero según el tipo de documento
+_SEMANTIC_SPLITS_BY_TYPE: dict[str, tuple[str, ...]] = {
+    "reglamento": ("articles",),
+    "resolucion": ("articles", "headers"),
+    "programa": ("numbered",),
+}
+
+# Escáner de FAQs: cada match es una línea sin espacios en los bordes, y el
+# grupo `question` captura las que empiezan con bullet/guión/número/¿ y tienen ?
+_FAQ_LINE_RE = re.compile(
+    r"^[^\S\n]*(?:"
+    r"(?P<question>(?:[•\-–¿]|\d+[.)][^\S\n])[^\n]*\?[^\n]*?)"
+    r"|(?P<line>[^\n]*?)"
+    r")[^\S\n]*$",
+    re.MULTILINE,
+)
+_FAQ_SECTION_RE = re.compile(r"[A-ZÁÉÍÓÚÑ\s/]+")
+_FAQ_MARKER_RE = re.compile(r"^(?:[•\-–]\s*)?(?:\d+[.)]\s*)?")
+
 
 class ChunkStrategy(Enum):
     FIXED_SIZE = "fixed_size"
@@ -21,7 +56,15 @@ class ChunkStrategy(Enum):
     FAQ_QA_PAIRS = "faq_qa_pairs"
 
 
-@dataclass
+_STRATEGY_BY_TYPE: dict[str, ChunkStrategy] = {
+    "faq": ChunkStrategy.FAQ_QA_PAIRS,
+    "reglamento": ChunkStrategy.SEMANTIC,
+    "resolucion": ChunkStrategy.SEMANTIC,
+    "programa": ChunkStrategy.SEMANTIC,
+}
+
+
+@dataclass(slots=True)
 class Chunk:
     chunk_id: str
     text: str
@@ -110,10 +153,9 @@ class DocumentChunker:
         else:
             chunks = self._chunk_fixed_size(**kwargs)
 
-        # Asignar índices y token counts
+        # Asignar índices (cada estrategia ya calcula token_count al crear el chunk)
         for i, chunk in enumerate(chunks):
             chunk.chunk_index = i
-            chunk.token_count = self._estimate_tokens(chunk.text)
             chunk.strategy = strategy.value
             if not chunk.chunk_id:
                 chunk.chunk_id = f"{document_name}_{i}_{uuid.uuid4().hex[:8]}"
@@ -126,15 +168,7 @@ class DocumentChunker:
 
     def _select_strategy(self, document_type: str, text: str) -> ChunkStrategy:
         """Auto-selección de estrategia según tipo de documento."""
-        if document_type == "faq":
-            return ChunkStrategy.FAQ_QA_PAIRS
-        if document_type == "reglamento":
-            return ChunkStrategy.SEMANTIC
-        if document_type == "resolucion":
-            return ChunkStrategy.SEMANTIC
-        if document_type == "programa":
-            return ChunkStrategy.SEMANTIC
-        return ChunkStrategy.FIXED_SIZE
+        return _STRATEGY_BY_TYPE.get(document_type, ChunkStrategy.FIXED_SIZE)
 
     def _chunk_fixed_size(
         self,
@@ -145,59 +179,67 @@ class DocumentChunker:
         pages_text: Optional[list] = None,
     ) -> list[Chunk]:
         """Chunks de tamaño fijo con overlap, cortando en límites de oración."""
-        sentences = self._split_sentences(text)
+        sentences, word_counts = self._split_and_count(text)
+        tok_counts = [self._words_to_tokens(w) for w in word_counts]
         chunks = []
         current_tokens = 0
-        current_sentences = []
-        overlap_sentences = []
-
-        for sentence in sentences:
-            sent_tokens = self._estimate_tokens(sentence)
-
-            if current_tokens + sent_tokens > self.fixed_chunk_size and current_sentences:
-                chunk_text = " ".join(current_sentences)
-                if section_prefix:
-                    chunk_text = f"[{section_prefix}]\n{chunk_text}"
-
-                chunks.append(Chunk(
-                    chunk_id="",
-                    text=chunk_text,
-                    document_name=document_name,
-                    document_type=document_type,
-                    section_title=section_prefix,
+        start = 0  # Primera oración del chunk en construcción
+
+        # Sufijo más largo de la ventana que entra en el overlap; se mantiene
+        # incrementalmente en lugar de recorrer la ventana hacia atrás.
+        overlap_start = 0
+        overlap_tokens = 0
+
+        for i, sent_tokens in enumerate(tok_counts):
+            if current_tokens + sent_tokens > self.fixed_chunk_size and i > start:
+                chunks.append(self._build_fixed_chunk(
+                    sentences, word_counts, start, i,
+                    document_name, document_type, section_prefix,
                 ))
-
-                # Calcular overlap
-                overlap_tokens = 0
-                overlap_sentences = []
-                for s in reversed(current_sentences):
-                    s_tokens = self._estimate_tokens(s)
-                    if overlap_tokens + s_tokens > self.fixed_overlap:
-                        break
-                    overlap_sentences.insert(0, s)
-                    overlap_tokens += s_tokens
-
-                current_sentences = list(overlap_sentences)
+                start = overlap_start
                 current_tokens = overlap_tokens
 
-            current_sentences.append(sentence)
             current_tokens += sent_tokens
+            overlap_tokens += sent_tokens
+            while overlap_tokens > self.fixed_overlap:
+                overlap_tokens -= tok_counts[overlap_start]
+                overlap_start += 1
 
         # Último chunk
-        if current_sentences:
-            chunk_text = " ".join(current_sentences)
-            if section_prefix:
-                chunk_text = f"[{section_prefix}]\n{chunk_text}"
-            chunks.append(Chunk(
-                chunk_id="",
-                text=chunk_text,
-                document_name=document_name,
-                document_type=document_type,
-                section_title=section_prefix,
+        if start < len(sentences):
+            chunks.append(self._build_fixed_chunk(
+                sentences, word_counts, start, len(sentences),
+                document_name, document_type, section_prefix,
             ))
 
         return chunks
 
+    def _build_fixed_chunk(
+        self,
+        sentences: list[str],
+        word_counts: list[int],
+        start: int,
+        end: int,
+        document_name: str,
+        document_type: str,
+        section_prefix: str,
+    ) -> Chunk:
+        """Arma el chunk con las oraciones [start, end) y su token_count."""
+        chunk_text = " ".join(sentences[start:end])
+        words = sum(word_counts[start:end])
+        if section_prefix:
+            chunk_text = f"[{section_prefix}]\n{chunk_text}"
+            words += len(f"[{section_prefix}]".split())
+
+        return Chunk(
+            chunk_id="",
+            text=chunk_text,
+            document_name=document_name,
+            document_type=document_type,
+            section_title=section_prefix,
+            token_count=self._words_to_tokens(words),
+        )
+
     def _chunk_semantic(
         self,
         text: str,
@@ -205,83 +247,61 @@ class DocumentChunker:
         document_type: str,
         pages_text: Optional[list] = None,
     ) -> list[Chunk]:
-        """Chunking semántico que respeta estructura del documento."""
-        chunks = []
-
-        # Intentar dividir por artículos (Art. N)
-        article_pattern = r"\n(?=Art\.\s*\d+)"
-        sections = re.split(article_pattern, text)
-
-        if len(sections) > 1:
-            for section in sections:
-                section = section.strip()
-                if not section:
-                    continue
-
-                # Extraer título de sección
-                title_match = re.match(r"(Art\.\s*\d+[^.]*\.?)", section)
-                title = title_match.group(1).strip() if title_match else ""
-
-                chunks.append(Chunk(
-                    chunk_id="",
-                    text=section,
-                    document_name=document_name,
-                    document_type=document_type,
-                    section_title=title,
-                ))
-            return chunks
-
-        # Intentar dividir por secciones con headers en mayúsculas
-        header_pattern = r"\n(?=[A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s]{5,}(?:\n|:))"
-        sections = re.split(header_pattern, text)
-
-        if len(sections) > 1:
-            for section in sections:
-                section = section.strip()
-                if not section:
-                    continue
-
-                # Extraer título
-                lines = section.split("\n")
-                title = lines[0].strip() if lines else ""
-
-                chunks.append(Chunk(
-                    chunk_id="",
-                    text=section,
-                    document_name=document_name,
-                    document_type=document_type,
-                    section_title=title,
-                ))
-            return chunks
-
-        # Intentar dividir por secciones numeradas (I., II., III. o 1., 2., 3.)
-        numbered_pattern = r"\n(?=(?:[IVXLC]+\.|[0-9]+\.)\s+[A-ZÁÉÍÓÚÑ])"
-        sections = re.split(numbered_pattern, text)
-
-        if len(sections) > 1:
-            for section in sections:
-                section = section.strip()
-                if not section:
-                    continue
-                lines = section.split("\n")
-                title = lines[0].strip() if lines else ""
-                chunks.append(Chunk(
-                    chunk_id="",
-                    text=section,
-                    document_name=document_name,
-                    document_type=document_type,
-                    section_title=title,
-                ))
-            return chunks
+        """Chunking semántico que respeta estructura del documento.
+
+        Prueba primero los cortes propios del tipo de documento y, si ninguno
+        divide el texto, el resto de la cascada genérica.
+        """
+        preferred = _SEMANTIC_SPLITS_BY_TYPE.get(document_type, ())
+        fallback = tuple(k for k in _SEMANTIC_SPLIT_ORDER if k not in preferred)
+
+        for kind in preferred + fallback:
+            sections = _SECTION_SPLIT_RES[kind].split(text)
+            if len(sections) > 1:
+                return self._sections_to_chunks(
+                    sections, kind, document_name, document_type
+                )
 
         # Fallback: un solo chunk grande (se subdividirá por fixed_size)
-        chunks.append(Chunk(
+        return [Chunk(
             chunk_id="",
             text=text,
             document_name=document_name,
             document_type=document_type,
             section_title=document_name,
-        ))
+            token_count=self._estimate_tokens(text),
+        )]
+
+    def _sections_to_chunks(
+        self,
+        sections: list[str],
+        kind: str,
+        document_name: str,
+        document_type: str,
+    ) -> list[Chunk]:
+        """Un chunk por sección no vacía, titulado según el tipo de corte."""
+        chunks = []
+        for section in sections:
+            section = section.strip()
+            if not section:
+                continue
+
+            if kind == "articles":
+                # Título: "Art. N ..." hasta el primer punto
+                title_match = _ARTICLE_TITLE_RE.match(section)
+                title = title_match.group(1).strip() if title_match else ""
+            else:
+                # Título: primera línea (header en mayúsculas o numerado)
+                title = section.split("\n", 1)[0].strip()
+
+            chunks.append(Chunk(
+                chunk_id="",
+                text=section,
+                document_name=document_name,
+                document_type=document_type,
+                section_title=title,
+                token_count=self._estimate_tokens(section),
+            ))
         return chunks
 
     def _chunk_faq_qa_pairs(
@@ -294,72 +314,48 @@ class DocumentChunker:
         """Chunking para FAQs: cada par Q&A es un chunk atómico."""
         chunks = []
         current_section = "General"
-
-        # Detectar secciones (headers en mayúsculas o negrita)
-        lines = text.split("\n")
         current_question = ""
         current_answer_lines = []
         in_answer = False
 
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                if in_answer:
-                    current_answer_lines.append("")
-                continue
-
-            # Detectar header de sección
-            if (
-                stripped.isupper()
-                and len(stripped) > 5
-                and "?" not in stripped
-                and not stripped.startswith("•")
-            ):
-                current_section = stripped
-                continue
-
-            # Detectar header de sección tipo "SECCION / SUBSECCION"
-            if re.match(r"^[A-ZÁÉÍÓÚÑ\s/]+$", stripped) and len(stripped) > 5:
-                current_section = stripped
+        for match in _FAQ_LINE_RE.finditer(text):
+            question = match.group("question")
+
+            if question is None:
+                stripped = match.group("line")
+                if not stripped:
+                    if in_answer:
+                        current_answer_lines.append("")
+                # Detectar header de sección (mayúsculas o "SECCION / SUBSECCION")
+                elif self._is_faq_section(stripped):
+                    current_section = stripped
+                elif in_answer:
+                    current_answer_lines.append(stripped)
                 continue
 
-            # Detectar pregunta (empieza con bullet/guión/número y tiene ?)
-            is_question = (
-                ("?" in stripped)
-                and (
-                    stripped.startswith("•")
-                    or stripped.startswith("-")
-                    or stripped.startswith("–")
-                    or re.match(r"^\d+[\.\)]\s", stripped)
-                    or stripped.startswith("¿")
+            # Pregunta (empieza con bullet/guión/número/¿ y tiene ?):
+            # guardar Q&A anterior si existe
+            if current_question and current_answer_lines:
+                answer_text = "\n".join(current_answer_lines).strip()
+                qa_text = (
+                    f"[Sección: {current_section}]\n"
+                    f"Pregunta: {current_question}\n"
+                    f"Respuesta: {answer_text}"
                 )
-            )
+                chunks.append(Chunk(
+                    chunk_id="",
+                    text=qa_text,
+                    document_name=document_name,
+                    document_type=document_type,
+                    section_title=current_section,
+                    metadata={"question": current_question},
+                    token_count=self._estimate_tokens(qa_text),
+                ))
 
-            if is_question:
-                # Guardar Q&A anterior si existe
-                if current_question and current_answer_lines:
-                    answer_text = "\n".join(current_answer_lines).strip()
-                    qa_text = (
-                        f"[Sección: {current_section}]\n"
-                        f"Pregunta: {current_question}\n"
-                        f"Respuesta: {answer_text}"
-                    )
-                    chunks.append(Chunk(
-                        chunk_id="",
-                        text=qa_text,
-                        document_name=document_name,
-                        document_type=document_type,
-                        section_title=current_section,
-                        metadata={"question": current_question},
-                    ))
-
-                # Nueva pregunta
-                current_question = re.sub(r"^[•\-–]\s*", "", stripped)
-                current_question = re.sub(r"^\d+[\.\)]\s*", "", current_question)
-                current_answer_lines = []
-                in_answer = True
-            elif in_answer:
-                current_answer_lines.append(stripped)
+            # Nueva pregunta
+            current_question = _FAQ_MARKER_RE.sub("", question, count=1)
+            current_answer_lines = []
+            in_answer = True
 
         # Último Q&A
         if current_question and current_answer_lines:
@@ -376,6 +372,7 @@ class DocumentChunker:
                 document_type=document_type,
                 section_title=current_section,
                 metadata={"question": current_question},
+                token_count=self._estimate_tokens(qa_text),
             ))
 
         # Si no se detectaron Q&A, fallback a semántico
@@ -389,26 +386,36 @@ class DocumentChunker:
 
         return chunks
 
+    @staticmethod
+    def _is_faq_section(line: str) -> bool:
+        """Header de sección de FAQ (línea en mayúsculas sin pregunta)."""
+        if len(line) <= 5:
+            return False
+        if line.isupper() and "?" not in line and not line.startswith("•"):
+            return True
+        return _FAQ_SECTION_RE.fullmatch(line) is not None
+
     def _split_sentences(self, text: str) -> list[str]:
         """Divide texto en oraciones respetando abreviaturas comunes."""
-        # Proteger abreviaturas comunes
-        text = re.sub(r"Art\.", "Art§", text)
-        text = re.sub(r"Inc\.", "Inc§", text)
-        text = re.sub(r"Dr\.", "Dr§", text)
-        text = re.sub(r"Ing\.", "Ing§", text)
-        text = re.sub(r"Esp\.", "Esp§", text)
-        text = re.sub(r"Mag\.", "Mag§", text)
+        # Proteger abreviaturas comunes (una sola pasada)
+        text = _ABBR_RE.sub(r"\1§", text)
 
         # Dividir por puntos, signos de exclamación/interrogación
-        sentences = re.split(r"(?<=[.!?])\s+(?=[A-ZÁÉÍÓÚÑ¿¡])", text)
+        sentences = _SENT_SPLIT_RE.split(text)
 
-        # Restaurar abreviaturas
-        sentences = [s.replace("§", ".") for s in sentences]
+        # Restaurar abreviaturas y filtrar vacías (un solo strip por oración)
+        sentences = (s.translate(_ABBR_RESTORE).strip() for s in sentences)
+        return [s for s in sentences if s]
 
-        # Filtrar vacías
-        return [s.strip() for s in sentences if s.strip()]
+    def _split_and_count(self, text: str) -> tuple[list[str], list[int]]:
+        """Oraciones y su cantidad de palabras (un solo split por oración)."""
+        sentences = self._split_sentences(text)
+        return sentences, [len(s.split()) for s in sentences]
 
     def _estimate_tokens(self, text: str) -> int:
         """Estimación aproximada de tokens (factor 1.3 para español)."""
-        words = len(text.split())
+        return self._words_to_tokens(len(text.split()))
+
+    @staticmethod
+    def _words_to_tokens(words: int) -> int:
         return int(words * 1.3)
@@ -7,13 +7,14 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 
 import re
 from dataclasses import dataclass, field
+from itertools import product
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentMetadata:
     filename: str
     document_type: str
@@ -158,6 +159,14 @@ FILENAME_ALIASES: dict[str, str] = {
 }
 
 
+def _expand_keyword(keyword: str) -> list[str]:
+    """Expande clases de caracteres ("fecha l[ií]mite") a literales en minúscula."""
+    parts = re.split(r"\[([^\]]+)\]", keyword.lower())
+    # Las posiciones impares son el contenido de cada [...]
+    options = [list(p) if i % 2 else [p] for i, p in enumerate(parts)]
+    return ["".join(combo) for combo in product(*options)]
+
+
 class MetadataExtractor:
     """Extrae y enriquece metadatos para documentos y chunks."""
 
@@ -193,6 +202,22 @@ class MetadataExtractor:
         ),
     }
 
+    # Palabras (en minúscula) que exige cada alternativa de PROGRAM_PATTERNS:
+    # si ninguna alternativa tiene todas sus palabras en el texto, el regex
+    # no puede matchear y no se corre
+    PROGRAM_LITERALS = {
+        "CEIA": (("ceia",), ("especializaci", "inteligencia", "artificial")),
+        "CESE": (("cese",), ("especializaci", "sistemas", "embebidos")),
+        "CEIoT": (("ceiot",), ("especializaci", "internet", "cosas")),
+        "MIA": (("mia",), ("maestr", "inteligencia", "artificial")),
+        "MIAE": (("miae",), ("maestr", "inteligencia", "artificial", "embebida")),
+        "MIoT": (("miot",), ("maestr", "internet", "cosas")),
+        "MCB": (("mcb",), ("maestr", "ciencia", "datos")),
+    }
+    # Con estos caracteres el IGNORECASE de re matchea "i"/"s" donde
+    # str.lower() no las produce: ahí se corren siempre los regex
+    _CASEFOLD_SPECIAL = ("ı", "\u0307", "ſ")
+
     # Patrones de temas
     TOPIC_KEYWORDS = {
         "inscripcion": ["inscripci", "inscribi", "admisi", "postula"],
@@ -209,12 +234,22 @@ class MetadataExtractor:
         "gestion_proyectos": ["gesti[oó]n de proyectos", "GdP"],
         "vinculacion": ["vinculaci", "empresa", "industria"],
     }
+    # Keywords como literales en minúscula: búsqueda por substring en C
+    # (`in`), sin pasar por el motor de regex
+    TOPIC_LITERALS = {
+        topic: tuple(lit for kw in keywords for lit in _expand_keyword(kw))
+        for topic, keywords in TOPIC_KEYWORDS.items()
+    }
 
     EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w.-]+\.[\w]+")
     RESOLUTION_PATTERN = re.compile(r"RESCS-\d{4}-\d+-E-UBA-REC")
 
     def __init__(self):
         self.registry = DOCUMENT_REGISTRY
+        # Nombres del registry ya en minúscula para el matching parcial
+        self._registry_lower = [
+            (name.lower(), data) for name, data in self.registry.items()
+        ]
 
     def extract_document_metadata(self, filename: str, text: str) -> DocumentMetadata:
         """Combina datos del registry con extracción del contenido."""
@@ -235,17 +270,15 @@ class MetadataExtractor:
         metadata.contact_emails = self._extract_emails(text)
         metadata.resolution_number = self._extract_resolution(text)
 
-        # Agregar topics detectados en texto
-        detected_topics = self._extract_topics(text)
-        for topic in detected_topics:
-            if topic not in metadata.topics:
-                metadata.topics.append(topic)
-
-        # Agregar programas mencionados en texto
-        detected_programs = self._extract_program_references(text)
-        for prog in detected_programs:
-            if prog not in metadata.program_codes:
-                metadata.program_codes.append(prog)
+        # Agregar topics y programas detectados en texto. dict.fromkeys
+        # deduplica en O(n) conservando el orden (primero los del registry)
+        # y arma listas nuevas: las del registry no se modifican
+        metadata.topics = list(dict.fromkeys(
+            [*metadata.topics, *self._extract_topics(text)]
+        ))
+        metadata.program_codes = list(dict.fromkeys(
+            [*metadata.program_codes, *self._extract_program_references(text)]
+        ))
 
         return metadata
 
@@ -275,7 +308,12 @@ class MetadataExtractor:
 
         return chunk_meta
 
-    def _find_in_registry(self, filename: str) -> dict:
+    def get_registry_topics(self, filename: str) -> Optional[list[str]]:
+        """Topics del registry para `filename`, o None si no está registrado."""
+        registry_data = self._find_in_registry(filename, warn=False)
+        return registry_data.get("topics") if registry_data else None
+
+    def _find_in_registry(self, filename: str, warn: bool = True) -> dict:
         """Busca el archivo en el registry con matching flexible."""
         # Búsqueda exacta
         if filename in self.registry:
@@ -283,8 +321,8 @@ class MetadataExtractor:
 
         # Búsqueda por nombre parcial
         filename_lower = filename.lower()
-        for reg_name, data in self.registry.items():
-            if reg_name.lower() in filename_lower or filename_lower in reg_name.lower():
+        for reg_lower, data in self._registry_lower:
+            if reg_lower in filename_lower or filename_lower in reg_lower:
                 return data
 
         # Búsqueda por alias
@@ -292,11 +330,15 @@ class MetadataExtractor:
             if alias in filename_lower:
                 return self.registry.get(canonical, {})
 
-        logger.warning(f"Documento no encontrado en registry: {filename}")
+        if warn:
+            logger.warning(f"Documento no encontrado en registry: {filename}")
         return {}
 
     def _extract_emails(self, text: str) -> list[str]:
         """Extrae direcciones de email."""
+        # Sin "@" no hay match posible: se evita recorrer el texto con el regex
+        if "@" not in text:
+            return []
         return list(set(self.EMAIL_PATTERN.findall(text)))
 
     def _extract_resolution(self, text: str) -> Optional[str]:
@@ -307,18 +349,22 @@ class MetadataExtractor:
     def _extract_topics(self, text: str) -> list[str]:
         """Detecta topics por keywords en el texto."""
         text_lower = text.lower()
-        detected = []
-        for topic, keywords in self.TOPIC_KEYWORDS.items():
-            for kw in keywords:
-                if re.search(kw, text_lower):
-                    detected.append(topic)
-                    break
-        return detected
+        return [
+            topic for topic, literals in self.TOPIC_LITERALS.items()
+            if any(lit in text_lower for lit in literals)
+        ]
 
     def _extract_program_references(self, text: str) -> list[str]:
         """Detecta códigos de programas mencionados."""
+        text_lower = text.lower()
+        screen = not any(c in text_lower for c in self._CASEFOLD_SPECIAL)
         found = []
         for code, pattern in self.PROGRAM_PATTERNS.items():
+            if screen and not any(
+                all(word in text_lower for word in words)
+                for words in self.PROGRAM_LITERALS[code]
+            ):
+                continue
             if pattern.search(text):
                 found.append(code)
         return found
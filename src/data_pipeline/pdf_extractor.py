@@ -5,10 +5,11 @@ Usa PyMuPDF (fitz) para texto y pdfplumber para tablas.
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 import re
 import logging
 
@@ -26,7 +27,7 @@ class DocumentType(Enum):
     VINCULACION = "vinculacion"
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedPage:
     page_number: int
     text: str
@@ -35,7 +36,7 @@ class ExtractedPage:
     has_footer: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedDocument:
     filename: str
     filepath: str
@@ -67,24 +68,64 @@ class PDFExtractor:
         r"^.{0,5}UBA\s*fiuba.{0,5}$",
     ]
 
-    def __init__(self, fallback_on_error: bool = True):
+    # Toda línea que matchea algún patrón contiene (en minúsculas) alguno de
+    # estos literales; "ı" y U+0307 cubren el case-folding de re con la "i".
+    HEADER_FOOTER_LITERALS = (
+        "uba", "gina", "mero", "bueno", "gned by", "date:", "ı", "\u0307",
+    )
+
+    # Topics del registry cuyos documentos traen tablas útiles (plan de
+    # estudios, programas de materias); el resto no pasa por pdfplumber
+    TABLE_BEARING_TOPICS = frozenset({"plan_de_estudios", "programa_materia"})
+
+    def __init__(self, fallback_on_error: bool = True, parallel: bool = True):
         self.fallback_on_error = fallback_on_error
+        self.parallel = parallel
         self._header_re = [re.compile(p, re.IGNORECASE) for p in self.HEADER_PATTERNS]
         self._footer_re = [re.compile(p, re.IGNORECASE) for p in self.FOOTER_PATTERNS]
-
-    def extract(self, filepath: Path) -> ExtractedDocument:
-        """Extrae texto y tablas de un archivo PDF."""
+        self._header_footer_re = self._header_re + self._footer_re
+
+    def extract(
+        self,
+        filepath: Path,
+        parallel: Optional[bool] = None,
+        topics: Optional[Iterable[str]] = None,
+    ) -> ExtractedDocument:
+        """Extrae texto y tablas de un archivo PDF.
+
+        Con `parallel` (por defecto `self.parallel`) PyMuPDF y pdfplumber
+        leen el archivo en dos threads a la vez. Conviene desactivarlo
+        cuando ya se procesan varios PDFs en paralelo.
+
+        `topics` son los del registry del documento: si ninguno está en
+        TABLE_BEARING_TOPICS no se corre pdfplumber. Sin topics (documento
+        desconocido) siempre se buscan tablas.
+        """
         filepath = Path(filepath)
         if not filepath.exists():
             raise FileNotFoundError(f"PDF no encontrado: {filepath}")
 
         logger.info(f"Extrayendo: {filepath.name}")
 
-        # Extraer texto con PyMuPDF
-        pages = self._extract_with_pymupdf(filepath)
+        with_tables = (
+            topics is None or not self.TABLE_BEARING_TOPICS.isdisjoint(topics)
+        )
 
-        # Extraer tablas con pdfplumber
-        all_tables = self._extract_tables_with_pdfplumber(filepath)
+        # Texto con PyMuPDF y tablas con pdfplumber (independientes)
+        if not with_tables:
+            logger.debug(f"Se omite pdfplumber (sin tablas): {filepath.name}")
+            pages = self._extract_with_pymupdf(filepath)
+            all_tables = []
+        elif self.parallel if parallel is None else parallel:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                tables_future = executor.submit(
+                    self._extract_tables_with_pdfplumber, filepath
+                )
+                pages = self._extract_with_pymupdf(filepath)
+                all_tables = tables_future.result()
+        else:
+            pages = self._extract_with_pymupdf(filepath)
+            all_tables = self._extract_tables_with_pdfplumber(filepath)
 
         # Combinar tablas en las páginas correspondientes
         for table_info in all_tables:
@@ -92,16 +133,19 @@ class PDFExtractor:
             if page_num < len(pages):
                 pages[page_num].tables.append(table_info["data"])
 
-        # Texto completo
-        raw_text = "\n\n".join(p.text for p in pages if p.text.strip())
+        # Texto completo (sin limpiar) y limpieza de headers/footers por
+        # página en una sola pasada; join reserva el tamaño exacto una vez
+        raw_parts = []
+        for page in pages:
+            text = page.text
+            if text.strip():
+                raw_parts.append(text)
+            page.text = self._remove_headers_footers(text)
+        raw_text = "\n\n".join(raw_parts)
 
         # Detectar tipo de documento
         doc_type = self._detect_document_type(filepath.name, raw_text)
 
-        # Limpiar headers/footers de cada página
-        for page in pages:
-            page.text = self._remove_headers_footers(page.text, doc_type)
-
         # Recopilar todas las tablas
         doc_tables = []
         for page in pages:
@@ -126,21 +170,17 @@ class PDFExtractor:
         """Extracción primaria con PyMuPDF."""
         pages = []
         try:
-            doc = fitz.open(str(filepath))
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text("text")
-
-                has_header = any(p.search(text[:200]) for p in self._header_re)
-                has_footer = any(p.search(text[-200:]) for p in self._footer_re)
-
-                pages.append(ExtractedPage(
-                    page_number=page_num + 1,
-                    text=text,
-                    has_header=has_header,
-                    has_footer=has_footer,
-                ))
-            doc.close()
+            # `with` cierra el documento aunque falle alguna página
+            with fitz.open(str(filepath)) as doc:
+                for page_num, page in enumerate(doc):
+                    text = page.get_text("text")
+
+                    pages.append(ExtractedPage(
+                        page_number=page_num + 1,
+                        text=text,
+                        has_header=self._matches_any(text[:200], self._header_re),
+                        has_footer=self._matches_any(text[-200:], self._footer_re),
+                    ))
         except Exception as e:
             logger.error(f"Error PyMuPDF en {filepath.name}: {e}")
             if not self.fallback_on_error:
@@ -205,8 +245,14 @@ class PDFExtractor:
 
         return DocumentType.RESOLUTION  # Default
 
-    def _remove_headers_footers(self, text: str, doc_type: DocumentType) -> str:
-        """Elimina headers y footers institucionales recurrentes."""
+    def _remove_headers_footers(
+        self, text: str, doc_type: Optional[DocumentType] = None
+    ) -> str:
+        """Elimina headers y footers institucionales recurrentes.
+
+        Los patrones son los mismos para todo tipo de documento, así que
+        `doc_type` es opcional (se limpia antes de detectar el tipo).
+        """
         lines = text.split("\n")
         cleaned_lines = []
 
@@ -216,13 +262,15 @@ class PDFExtractor:
                 cleaned_lines.append(line)
                 continue
 
-            is_header_footer = False
-            for pattern in self._header_re + self._footer_re:
-                if pattern.search(stripped):
-                    is_header_footer = True
-                    break
-
-            if not is_header_footer:
+            if not self._matches_any(stripped, self._header_footer_re):
                 cleaned_lines.append(line)
 
         return "\n".join(cleaned_lines)
+
+    def _matches_any(self, text: str, patterns: list[re.Pattern]) -> bool:
+        """True si algún patrón de header/footer aparece en `text`."""
+        # Descarte barato: sin ningún literal no puede matchear
+        lowered = text.lower()
+        if not any(lit in lowered for lit in self.HEADER_FOOTER_LITERALS):
+            return False
+        return any(p.search(text) for p in patterns)
@@ -6,15 +6,19 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
 import hashlib
-import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
 from src.data_pipeline.pdf_extractor import PDFExtractor
 from src.data_pipeline.text_cleaner import SpanishTextCleaner
 from src.data_pipeline.chunker import DocumentChunker, Chunk
-from src.data_pipeline.metadata_extractor import MetadataExtractor
+from src.data_pipeline.metadata_extractor import FILENAME_ALIASES, MetadataExtractor
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,14 @@ class PipelineOrchestrator:
     """Pipeline end-to-end con detección de cambios y procesamiento incremental."""
 
     STATE_FILE = ".pipeline_state.json"
+    # Claves de caché por documento (fuera de metadata/ y chunks/)
+    CACHE_DIR = ".cache"
+    # Subir al cambiar el formato de metadata/chunks o el código que los genera
+    CACHE_VERSION = 1
+    # Campo donde versiones anteriores guardaban la clave dentro de la metadata
+    LEGACY_CACHE_KEY_FIELD = "_pipeline_cache"
+    # JSON indentado (más lento y pesado); los archivos solo los lee el código
+    DEBUG_JSON = False
 
     def __init__(
         self,
@@ -41,13 +53,22 @@ class PipelineOrchestrator:
         self.metadata_extractor = metadata_extractor or MetadataExtractor()
 
         # Crear directorios
-        for subdir in ["extracted", "cleaned", "chunks", "metadata"]:
+        for subdir in ["extracted", "cleaned", "chunks", "metadata", self.CACHE_DIR]:
             (self.processed_dir / subdir).mkdir(parents=True, exist_ok=True)
 
         self._state = self._load_state()
 
-    def process_all(self, force: bool = False) -> dict:
-        """Procesa todos los PDFs en raw_dir."""
+    def process_all(
+        self, force: bool = False, max_workers: Optional[int] = None
+    ) -> dict:
+        """Procesa todos los PDFs en raw_dir.
+
+        Los documentos son independientes entre sí: con `max_workers` > 1
+        (por defecto, un proceso por núcleo) se procesan en paralelo y el
+        estado se actualiza en este proceso. `max_workers=1` es secuencial.
+        Con `force` además se regeneran metadata y chunks aunque el texto
+        limpio no haya cambiado.
+        """
         pdf_files = list(self.raw_dir.glob("*.pdf"))
         logger.info(f"Encontrados {len(pdf_files)} archivos PDF")
 
@@ -58,20 +79,52 @@ class PipelineOrchestrator:
             "total_chunks": 0,
         }
 
+        to_process = []
+        fingerprints = {}
         for pdf_path in pdf_files:
-            if not force and not self._has_changed(pdf_path):
+            changed, fingerprints[pdf_path.name] = self._has_changed(pdf_path)
+            if not force and not changed:
+                # Mismo contenido: se guarda la huella (mtime) para no rehashear
+                self._state[pdf_path.name] = fingerprints[pdf_path.name]
                 results["skipped"].append(pdf_path.name)
                 logger.info(f"  Sin cambios: {pdf_path.name}")
                 continue
-
-            try:
-                chunks = self.process_single(pdf_path)
-                results["processed"].append(pdf_path.name)
-                results["total_chunks"] += len(chunks)
-                logger.info(f"  Procesado: {pdf_path.name} -> {len(chunks)} chunks")
-            except Exception as e:
-                results["errors"].append({"file": pdf_path.name, "error": str(e)})
-                logger.error(f"  Error en {pdf_path.name}: {e}")
+            to_process.append(pdf_path)
+
+        workers = min(max_workers or os.cpu_count() or 1, len(to_process))
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            if executor is not None:
+                # Un PDF por proceso: sin threads extra dentro de cada uno
+                futures = [
+                    executor.submit(
+                        self._process_document,
+                        pdf_path,
+                        parallel_extraction=False,
+                        reuse_cached=not force,
+                    )
+                    for pdf_path in to_process
+                ]
+                runs = [future.result for future in futures]
+            else:
+                runs = [
+                    partial(self._process_document, p, reuse_cached=not force)
+                    for p in to_process
+                ]
+
+            for pdf_path, run in zip(to_process, runs):
+                try:
+                    chunks = run()
+                    self._state[pdf_path.name] = fingerprints[pdf_path.name]
+                    results["processed"].append(pdf_path.name)
+                    results["total_chunks"] += len(chunks)
+                    logger.info(f"  Procesado: {pdf_path.name} -> {len(chunks)} chunks")
+                except Exception as e:
+                    results["errors"].append({"file": pdf_path.name, "error": str(e)})
+                    logger.error(f"  Error en {pdf_path.name}: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
         self._save_state()
 
@@ -83,14 +136,37 @@ class PipelineOrchestrator:
         )
         return results
 
-    def process_single(self, filepath: Path) -> list[Chunk]:
+    def process_single(self, filepath: Path, force: bool = False) -> list[Chunk]:
         """Pipeline completo para un documento."""
         filepath = Path(filepath)
+        chunks = self._process_document(filepath, reuse_cached=not force)
+
+        # Actualizar estado
+        _, self._state[filepath.name] = self._has_changed(filepath)
+
+        return chunks
+
+    def _process_document(
+        self,
+        filepath: Path,
+        parallel_extraction: Optional[bool] = None,
+        reuse_cached: bool = True,
+    ) -> list[Chunk]:
+        """Extracción, limpieza, metadata y chunking de un documento.
+
+        No toca `self._state`, así que puede correr en un proceso worker.
+        Con `reuse_cached`, si el texto limpio y la configuración del chunker
+        son los de la corrida anterior se devuelven los chunks guardados.
+        """
         stem = filepath.stem
 
         # 1. Extracción
         logger.info(f"  [1/4] Extrayendo texto: {filepath.name}")
-        doc = self.extractor.extract(filepath)
+        doc = self.extractor.extract(
+            filepath,
+            parallel=parallel_extraction,
+            topics=self.metadata_extractor.get_registry_topics(filepath.name),
+        )
 
         # Guardar texto extraído
         extracted_path = self.processed_dir / "extracted" / f"{stem}.txt"
@@ -105,6 +181,22 @@ class PipelineOrchestrator:
         cleaned_path = self.processed_dir / "cleaned" / f"{stem}.txt"
         cleaned_path.write_text(cleaned_text, encoding="utf-8")
 
+        # Mismo texto limpio, chunker y reglas de metadata: metadata y chunks
+        # no cambian
+        cache_key = {
+            "version": self.CACHE_VERSION,
+            "cleaned_hash": hashlib.blake2b(
+                cleaned_text.encode("utf-8"), digest_size=16
+            ).hexdigest(),
+            "chunker": self._chunker_config(),
+            "metadata": self._metadata_fingerprint(),
+        }
+        if reuse_cached:
+            cached = self._load_cached_chunks(stem, cache_key)
+            if cached is not None:
+                logger.info(f"  Texto limpio sin cambios: {filepath.name}")
+                return cached
+
         # 3. Metadata del documento
         logger.info(f"  [3/4] Extrayendo metadata: {filepath.name}")
         doc_metadata = self.metadata_extractor.extract_document_metadata(
@@ -113,10 +205,7 @@ class PipelineOrchestrator:
 
         # Guardar metadata
         meta_path = self.processed_dir / "metadata" / f"{stem}.json"
-        meta_path.write_text(
-            json.dumps(doc_metadata.to_dict(), ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        meta_path.write_bytes(self._dump_json(doc_metadata.to_dict()))
 
         # 4. Chunking
         logger.info(f"  [4/4] Generando chunks: {filepath.name}")
@@ -138,16 +227,53 @@ class PipelineOrchestrator:
         # Guardar chunks
         chunks_path = self.processed_dir / "chunks" / f"{stem}.json"
         chunks_data = [c.to_dict() for c in chunks]
-        chunks_path.write_text(
-            json.dumps(chunks_data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        chunks_path.write_bytes(self._dump_json(chunks_data))
 
-        # Actualizar estado
-        self._state[filepath.name] = self._compute_file_hash(filepath)
+        # La clave se escribe al final: solo vale si metadata y chunks quedaron
+        self._cache_key_path(stem).write_bytes(self._dump_json(cache_key))
 
         return chunks
 
+    def _chunker_config(self) -> dict:
+        """Parámetros escalares del chunker (forman parte de la clave de caché)."""
+        return {
+            name: value
+            for name, value in sorted(vars(self.chunker).items())
+            if isinstance(value, (int, float, str, bool))
+        }
+
+    def _metadata_fingerprint(self) -> str:
+        """Hash del registry y los patrones con que se arma la metadata."""
+        extractor = self.metadata_extractor
+        rules = {
+            "registry": extractor.registry,
+            "aliases": FILENAME_ALIASES,
+            "programs": {
+                code: pattern.pattern
+                for code, pattern in extractor.PROGRAM_PATTERNS.items()
+            },
+            "topics": extractor.TOPIC_KEYWORDS,
+        }
+        data = orjson.dumps(rules, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _cache_key_path(self, stem: str) -> Path:
+        return self.processed_dir / self.CACHE_DIR / f"{stem}.json"
+
+    def _load_cached_chunks(
+        self, stem: str, cache_key: dict
+    ) -> Optional[list[Chunk]]:
+        """Chunks guardados de `stem` si se generaron con la misma clave de caché."""
+        chunks_path = self.processed_dir / "chunks" / f"{stem}.json"
+        try:
+            stored_key = orjson.loads(self._cache_key_path(stem).read_bytes())
+            if stored_key != cache_key:
+                return None
+            data = orjson.loads(chunks_path.read_bytes())
+            return [Chunk.from_dict(item) for item in data]
+        except (OSError, orjson.JSONDecodeError, KeyError, TypeError):
+            return None
+
     def get_all_chunks(self) -> list[Chunk]:
         """Carga todos los chunks procesados desde disco."""
         chunks_dir = self.processed_dir / "chunks"
@@ -155,7 +281,7 @@ class PipelineOrchestrator:
 
         for chunk_file in sorted(chunks_dir.glob("*.json")):
             try:
-                data = json.loads(chunk_file.read_text(encoding="utf-8"))
+                data = orjson.loads(chunk_file.read_bytes())
                 for item in data:
                     all_chunks.append(Chunk.from_dict(item))
             except Exception as e:
@@ -171,7 +297,8 @@ class PipelineOrchestrator:
 
         for meta_file in sorted(meta_dir.glob("*.json")):
             try:
-                data = json.loads(meta_file.read_text(encoding="utf-8"))
+                data = orjson.loads(meta_file.read_bytes())
+                data.pop(self.LEGACY_CACHE_KEY_FIELD, None)
                 all_meta.append(data)
             except Exception as e:
                 logger.error(f"Error cargando metadata de {meta_file.name}: {e}")
@@ -180,24 +307,44 @@ class PipelineOrchestrator:
 
     def _compute_file_hash(self, filepath: Path) -> str:
         """SHA-256 del archivo para detección de cambios."""
-        sha256 = hashlib.sha256()
+        # file_digest lee y hashea en C (sin el loop de bloques en Python)
         with open(filepath, "rb") as f:
-            for block in iter(lambda: f.read(8192), b""):
-                sha256.update(block)
-        return sha256.hexdigest()
-
-    def _has_changed(self, filepath: Path) -> bool:
-        """Verifica si el archivo cambió desde el último procesamiento."""
-        current_hash = self._compute_file_hash(filepath)
-        stored_hash = self._state.get(filepath.name)
-        return current_hash != stored_hash
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    def _has_changed(self, filepath: Path) -> tuple[bool, dict]:
+        """Verifica si el archivo cambió desde el último procesamiento.
+
+        Devuelve también la huella actual ({hash, mtime_ns, size}) para
+        guardarla en el estado sin volver a hashear. Si mtime y tamaño
+        coinciden con los guardados, no se lee el archivo.
+        """
+        stat = filepath.stat()
+        stored = self._state.get(filepath.name)
+
+        # Estados viejos guardaban solo el hash (str)
+        if isinstance(stored, dict):
+            if (
+                stored.get("mtime_ns") == stat.st_mtime_ns
+                and stored.get("size") == stat.st_size
+            ):
+                return False, stored
+            stored_hash = stored.get("hash")
+        else:
+            stored_hash = stored
+
+        fingerprint = {
+            "hash": self._compute_file_hash(filepath),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        return fingerprint["hash"] != stored_hash, fingerprint
 
     def _load_state(self) -> dict:
         """Carga estado del pipeline desde disco."""
         state_path = self.processed_dir / self.STATE_FILE
         if state_path.exists():
             try:
-                return json.loads(state_path.read_text(encoding="utf-8"))
+                return orjson.loads(state_path.read_bytes())
             except Exception:
                 pass
         return {}
@@ -205,7 +352,9 @@ class PipelineOrchestrator:
     def _save_state(self) -> None:
         """Persiste estado del pipeline."""
         state_path = self.processed_dir / self.STATE_FILE
-        state_path.write_text(
-            json.dumps(self._state, indent=2),
-            encoding="utf-8",
-        )
+        state_path.write_bytes(self._dump_json(self._state))
+
+    def _dump_json(self, data) -> bytes:
+        """Serializa a JSON UTF-8 con orjson (indentado si DEBUG_JSON)."""
+        option = orjson.OPT_INDENT_2 if self.DEBUG_JSON else 0
+        return orjson.dumps(data, option=option)
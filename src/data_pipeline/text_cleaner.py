@@ -12,6 +12,38 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# ── Artefactos de encoding ───────────────────────────────────────
+_ENCODING_FIXES = {
+    # Vocales y eñes en UTF-8 decodificadas como Latin-1
+    "\u00c3\u00a1": "á",
+    "\u00c3\u00a9": "é",
+    "\u00c3\u00ad": "í",
+    "\u00c3\u00b3": "ó",
+    "\u00c3\u00ba": "ú",
+    "\u00c3\u00b1": "ñ",
+    "\u00c3\u00bc": "ü",
+    "\u00c3\u0081": "Á",
+    "\u00c3\u0089": "É",
+    "\u00c3\u008d": "Í",
+    "\u00c3\u0093": "Ó",
+    "\u00c3\u009a": "Ú",
+    "\u00c3\u0091": "Ñ",
+    "\uf0b7": "•",  # Bullet point
+    "\uf0a7": "•",
+    "\u2018": "'",
+    "\u2019": "'",
+    "\u201c": '"',
+    "\u201d": '"',
+    "\xa0": " ",    # Non-breaking space
+    "\xad": "",     # Soft hyphen
+}
+# Una sola pasada con la alternancia de todos los literales. El match de
+# más a la izquierda toma "Ã" + \xad como "í" antes de ver el soft hyphen
+_ENCODING_RE = re.compile("|".join(map(re.escape, _ENCODING_FIXES)))
+# Todo artefacto empieza con uno de estos caracteres ("Ã" para los pares)
+_ENCODING_FIRST_CHARS = tuple(dict.fromkeys(key[0] for key in _ENCODING_FIXES))
+
+
 @dataclass
 class CleaningResult:
     original_text: str
@@ -47,12 +79,21 @@ class SpanishTextCleaner:
         r"^\s*\d+\s*$",
     ]
 
-    def __init__(self):
-        self._institutional_re = [
-            re.compile(p, re.IGNORECASE) for p in self.INSTITUTIONAL_HEADERS
-        ]
-        self._docid_re = [re.compile(p) for p in self.DOCUMENT_ID_PATTERNS]
-        self._page_re = [re.compile(p, re.MULTILINE) for p in self.PAGE_PATTERNS]
+    # Regex compilados una vez al importar el módulo (compartidos por
+    # todas las instancias)
+    _INSTITUTIONAL_RE = tuple(
+        re.compile(p, re.IGNORECASE) for p in INSTITUTIONAL_HEADERS
+    )
+    _DOCID_RE = tuple(re.compile(p) for p in DOCUMENT_ID_PATTERNS)
+    _DOCID_LITERAL = "-UBA-"
+    _PAGE_RE = tuple(re.compile(p, re.MULTILINE) for p in PAGE_PATTERNS)
+    _HYPHEN_RE = re.compile(r"(\w+)-\s*\n\s*([a-záéíóúñü])")
+    _BULLET_RE = re.compile(r"^[\s]*[►▪▸‣⁃◦●○■□–—]\s*", re.MULTILINE)
+    _ARTICLE_RE = re.compile(
+        r"(?:ART[IÍ]CULO|ARTICULO|Art\.?)\s*(\d+)", re.IGNORECASE
+    )
+    _HSPACE_RE = re.compile(r"[^\S\n]+")
+    _NEWLINES_RE = re.compile(r"\n{3,}")
 
     def clean(self, text: str, document_type: str = None) -> CleaningResult:
         """Pipeline completo de limpieza."""
@@ -114,85 +155,58 @@ class SpanishTextCleaner:
 
     def _normalize_unicode(self, text: str) -> str:
         """Normaliza caracteres Unicode preservando acentos españoles."""
+        # Texto ASCII puro: no hay acentos que componer
+        if text.isascii():
+            return text
         # NFC: composed form (é en vez de e + combining accent)
         text = unicodedata.normalize("NFC", text)
         return text
 
     def _fix_encoding_artifacts(self, text: str) -> str:
         """Corrige artefactos comunes de encoding PDF."""
-        replacements = {
-            "\u00c3\u00a1": "á",
-            "\u00c3\u00a9": "é",
-            "\u00c3\u00ad": "í",
-            "\u00c3\u00b3": "ó",
-            "\u00c3\u00ba": "ú",
-            "\u00c3\u00b1": "ñ",
-            "\u00c3\u00bc": "ü",
-            "\u00c3\u0081": "Á",
-            "\u00c3\u0089": "É",
-            "\u00c3\u008d": "Í",
-            "\u00c3\u0093": "Ó",
-            "\u00c3\u009a": "Ú",
-            "\u00c3\u0091": "Ñ",
-            "\uf0b7": "•",  # Bullet point
-            "\uf0a7": "•",
-            "\u2022": "•",
-            "\u2013": "–",  # En dash
-            "\u2014": "—",  # Em dash
-            "\u2018": "'",
-            "\u2019": "'",
-            "\u201c": '"',
-            "\u201d": '"',
-            "\xa0": " ",    # Non-breaking space
-            "\xad": "",     # Soft hyphen
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        return text
+        # Texto ya limpio (lo habitual): unas búsquedas de un carácter en C
+        # evitan recorrer todo el texto con el regex
+        if not any(ch in text for ch in _ENCODING_FIRST_CHARS):
+            return text
+        return _ENCODING_RE.sub(lambda m: _ENCODING_FIXES[m.group(0)], text)
 
     def _remove_institutional_headers(self, text: str) -> str:
         """Elimina headers institucionales repetitivos."""
-        for pattern in self._institutional_re:
+        for pattern in self._INSTITUTIONAL_RE:
             text = pattern.sub("", text)
         return text
 
     def _remove_document_ids(self, text: str) -> str:
         """Elimina IDs de referencia de documentos oficiales."""
-        for pattern in self._docid_re:
+        # Todos los formatos de ID llevan "-UBA-": sin él no hay nada que quitar
+        if self._DOCID_LITERAL not in text:
+            return text
+        for pattern in self._DOCID_RE:
             text = pattern.sub("", text)
         return text
 
     def _remove_page_numbers(self, text: str) -> str:
         """Elimina indicadores de número de página."""
-        for pattern in self._page_re:
+        for pattern in self._PAGE_RE:
             text = pattern.sub("", text)
         return text
 
     def _fix_hyphenation(self, text: str) -> str:
         """Reúne palabras cortadas por guión de fin de línea."""
         # Patrón: palabra- \n continuación (sin mayúscula = no es inicio de oración)
-        text = re.sub(
-            r"(\w+)-\s*\n\s*([a-záéíóúñü])",
-            r"\1\2",
-            text,
-        )
+        text = self._HYPHEN_RE.sub(r"\1\2", text)
         return text
 
     def _normalize_bullets(self, text: str) -> str:
         """Estandariza caracteres de viñetas."""
         # Diferentes tipos de bullets a formato estándar
-        text = re.sub(r"^[\s]*[►▪▸‣⁃◦●○■□–—]\s*", "• ", text, flags=re.MULTILINE)
+        text = self._BULLET_RE.sub("• ", text)
         return text
 
     def _preserve_structure_markers(self, text: str) -> str:
         """Asegura que marcadores de estructura sean consistentes."""
         # Normalizar "Art." / "Artículo" / "ARTICULO"
-        text = re.sub(
-            r"(?:ART[IÍ]CULO|ARTICULO|Art\.?)\s*(\d+)",
-            r"\nArt. \1",
-            text,
-            flags=re.IGNORECASE,
-        )
+        text = self._ARTICLE_RE.sub(r"\nArt. \1", text)
         return text
 
     def _normalize_whitespace(self, text: str) -> str:
@@ -200,9 +214,9 @@ class SpanishTextCleaner:
         # Reemplazar tabs por espacios
         text = text.replace("\t", " ")
         # Colapsar espacios horizontales múltiples
-        text = re.sub(r"[^\S\n]+", " ", text)
+        text = self._HSPACE_RE.sub(" ", text)
         # Colapsar más de 2 newlines a 2 (párrafo)
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        text = self._NEWLINES_RE.sub("\n\n", text)
         # Eliminar espacios al inicio/fin de cada línea
         lines = [line.strip() for line in text.split("\n")]
         text = "\n".join(lines)
@@ -6,10 +6,13 @@ Incluye métricas RAGAS (faithfulness, answer_relevance, context_precision).
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
+import hashlib
 import json
 import logging
 import time
-from dataclasses import dataclass, field
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -93,6 +96,12 @@ class EvaluationReport:
 class Evaluator:
     """Evaluador principal del sistema de chatbot."""
 
+    # Métricas RAGAS ya calculadas, por hash de (versión de métricas y modelo,
+    # pregunta, respuesta, contextos, ground truth, keywords)
+    RAGAS_CACHE_FILE = "ragas_cache.json"
+    # Embeddings de preguntas, respuestas y contextos (solo con embedding_model)
+    EMBEDDING_CACHE_FILE = "embedding_cache.npz"
+
     def __init__(
         self,
         hybrid_retriever,
@@ -100,83 +109,49 @@ class Evaluator:
         embedding_model=None,
         llm_provider=None,
         output_dir: Optional[Path] = None,
+        use_ragas_cache: bool = True,
     ):
         self.hybrid_retriever = hybrid_retriever
         self.answer_synthesizer = answer_synthesizer
         self.output_dir = output_dir or Path("data/evaluation")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.ragas = RAGASEvaluator(
-            embedding_model=embedding_model, llm_provider=llm_provider
+            embedding_model=embedding_model,
+            llm_provider=llm_provider,
+            embedding_cache_path=(
+                self.output_dir / self.EMBEDDING_CACHE_FILE if use_ragas_cache else None
+            ),
         )
+        self.use_ragas_cache = use_ragas_cache
+        # Otra versión de las métricas u otro modelo dan scores distintos
+        self._ragas_tag = self.ragas.cache_tag()
 
     def evaluate(
-        self, qa_pairs: list[dict], verbose: bool = True
+        self, qa_pairs: list[dict], verbose: bool = True, max_workers: int = 4
     ) -> EvaluationReport:
-        """Ejecuta evaluación completa sobre conjunto de preguntas."""
-        from src.hybrid.hybrid_retriever import RetrievalMode
+        """Ejecuta evaluación completa sobre conjunto de preguntas.
 
+        Las preguntas son independientes y el tiempo se va en esperar al LLM:
+        con `max_workers` > 1 se evalúan en paralelo en threads (los tiempos
+        por método incluyen la espera compartida). `max_workers=1` es
+        secuencial.
+        """
         report = EvaluationReport(total_questions=len(qa_pairs))
-        results = []
+        total = len(qa_pairs)
 
-        for i, qa in enumerate(qa_pairs):
-            if verbose:
-                logger.info(
-                    f"[{i+1}/{len(qa_pairs)}] Evaluando: {qa['question'][:60]}..."
-                )
+        def evaluate_one(item: tuple[int, dict]) -> QuestionResult:
+            i, qa = item
+            return self._evaluate_question(qa, i, total, verbose)
 
-            qr = QuestionResult(
-                question_id=qa["id"],
-                question=qa["question"],
-                category=qa.get("category", "unknown"),
-                difficulty=qa.get("difficulty", "unknown"),
-            )
+        workers = min(max_workers, total)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(evaluate_one, enumerate(qa_pairs)))
+        else:
+            results = [evaluate_one(item) for item in enumerate(qa_pairs)]
 
-            # Evaluar con cada método
-            for mode_name, mode_enum in [
-                ("rag", RetrievalMode.RAG_ONLY),
-                ("graph", RetrievalMode.GRAPH_ONLY),
-                ("hybrid", RetrievalMode.HYBRID),
-            ]:
-                start = time.time()
-                try:
-                    hybrid_result = self.hybrid_retriever.retrieve(
-                        query=qa["question"], mode=mode_enum, top_k=5
-                    )
-                    final = self.answer_synthesizer.synthesize(
-                        query=qa["question"], hybrid_result=hybrid_result
-                    )
-                    elapsed = (time.time() - start) * 1000
-
-                    setattr(qr, f"{mode_name}_answer", final.answer)
-                    setattr(qr, f"{mode_name}_confidence", final.confidence)
-                    setattr(qr, f"{mode_name}_time_ms", elapsed)
-                    setattr(qr, f"{mode_name}_sources", final.sources)
-
-                except Exception as e:
-                    logger.error(f"Error evaluando {mode_name}: {e}")
-                    setattr(qr, f"{mode_name}_time_ms",
-                            (time.time() - start) * 1000)
-
-            # Calcular métricas clásicas
-            self._compute_metrics(qr, qa)
-
-            # Calcular métricas RAGAS por método
-            for method in ["rag", "graph", "hybrid"]:
-                answer_text = getattr(qr, f"{method}_answer", "")
-                sources = getattr(qr, f"{method}_sources", [])
-                contexts = [
-                    s.get("text_snippet", "") for s in sources if s.get("text_snippet")
-                ]
-                ragas_result = self.ragas.evaluate(
-                    question=qa["question"],
-                    answer=answer_text,
-                    contexts=contexts,
-                    ground_truth=qa.get("expected_answer", ""),
-                    expected_keywords=qa.get("expected_keywords", []),
-                )
-                setattr(qr, f"{method}_ragas", ragas_result)
-
-            results.append(qr)
+        # RAGAS al final: con embeddings, una sola codificación para todo
+        self._compute_ragas(results, qa_pairs)
 
         report.question_results = results
         self._aggregate_report(report)
@@ -186,21 +161,149 @@ class Evaluator:
 
         return report
 
+    def _evaluate_question(
+        self, qa: dict, i: int, total: int, verbose: bool = True
+    ) -> QuestionResult:
+        """Evalúa una pregunta con los tres métodos y calcula sus métricas."""
+        from src.hybrid.hybrid_retriever import RetrievalMode
+
+        question = qa["question"]
+        if verbose:
+            logger.info(
+                f"[{i+1}/{total}] Evaluando: {question[:60]}..."
+            )
+
+        qr = QuestionResult(
+            question_id=qa["id"],
+            question=question,
+            category=qa.get("category", "unknown"),
+            difficulty=qa.get("difficulty", "unknown"),
+        )
+
+        # Evaluar con cada método
+        for mode_name, mode_enum in [
+            ("rag", RetrievalMode.RAG_ONLY),
+            ("graph", RetrievalMode.GRAPH_ONLY),
+            ("hybrid", RetrievalMode.HYBRID),
+        ]:
+            start = time.time()
+            try:
+                hybrid_result = self.hybrid_retriever.retrieve(
+                    query=question, mode=mode_enum, top_k=5
+                )
+                final = self.answer_synthesizer.synthesize(
+                    query=question, hybrid_result=hybrid_result
+                )
+                elapsed = (time.time() - start) * 1000
+
+                setattr(qr, f"{mode_name}_answer", final.answer)
+                setattr(qr, f"{mode_name}_confidence", final.confidence)
+                setattr(qr, f"{mode_name}_time_ms", elapsed)
+                setattr(qr, f"{mode_name}_sources", final.sources)
+
+            except Exception as e:
+                logger.error(f"Error evaluando {mode_name}: {e}")
+                setattr(qr, f"{mode_name}_time_ms",
+                        (time.time() - start) * 1000)
+
+        # Calcular métricas clásicas
+        self._compute_metrics(qr, qa)
+
+        return qr
+
+    def _compute_ragas(
+        self, results: list[QuestionResult], qa_pairs: list[dict]
+    ) -> None:
+        """Calcula las métricas RAGAS de todas las preguntas y métodos en un lote."""
+        methods = ["rag", "graph", "hybrid"]
+        targets = []
+        inputs = []
+        for qr, qa in zip(results, qa_pairs):
+            question = qa["question"]
+            expected_answer = qa.get("expected_answer", "")
+            expected_keywords = qa.get("expected_keywords", [])
+            for method in methods:
+                # Un solo get por fuente (el snippet vacío se descarta)
+                contexts = [
+                    snippet
+                    for s in getattr(qr, f"{method}_sources", [])
+                    if (snippet := s.get("text_snippet"))
+                ]
+                targets.append((qr, method))
+                inputs.append({
+                    "question": question,
+                    "answer": getattr(qr, f"{method}_answer", ""),
+                    "contexts": contexts,
+                    "ground_truth": expected_answer,
+                    "expected_keywords": expected_keywords,
+                })
+
+        for (qr, method), ragas_result in zip(targets, self._evaluate_ragas(inputs)):
+            setattr(qr, f"{method}_ragas", ragas_result)
+
+    def _evaluate_ragas(self, inputs: list[dict]) -> list[RAGASResult]:
+        """RAGAS de cada input, reusando los resultados guardados en disco.
+
+        Solo se evalúan (en un lote) los inputs que no están en la caché.
+        """
+        if not self.use_ragas_cache:
+            return self.ragas.evaluate_many(inputs)
+
+        cache_path = self.output_dir / self.RAGAS_CACHE_FILE
+        cache = {}
+        if cache_path.exists():
+            try:
+                cache = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning(f"Caché RAGAS ilegible, se descarta: {cache_path}")
+
+        keys = [self._ragas_cache_key(item) for item in inputs]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        if missing:
+            computed = self.ragas.evaluate_many([inputs[i] for i in missing])
+            for i, ragas_result in zip(missing, computed):
+                cache[keys[i]] = asdict(ragas_result)
+            cache_path.write_text(
+                json.dumps(cache, ensure_ascii=False, default=float),
+                encoding="utf-8",
+            )
+        logger.info(
+            f"RAGAS: {len(inputs) - len(missing)} desde caché, "
+            f"{len(missing)} calculados"
+        )
+
+        return [RAGASResult(**cache[key]) for key in keys]
+
+    def _ragas_cache_key(self, item: dict) -> str:
+        """Hash de todo lo que determina el resultado RAGAS de un input."""
+        payload = json.dumps(
+            [
+                self._ragas_tag,
+                item["question"],
+                item["answer"],
+                item["contexts"],
+                item["ground_truth"],
+                item["expected_keywords"],
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
     def _compute_metrics(self, qr: QuestionResult, qa: dict) -> None:
         """Calcula métricas para una pregunta."""
         expected_keywords = qa.get("expected_keywords", [])
         expected_source = qa.get("expected_source")
         is_ood = qa.get("category") == "out_of_domain"
+        # Keywords y fuente en minúscula una sola vez (no una por método)
+        keywords_lower = [kw.lower() for kw in expected_keywords]
+        expected_source_lower = (expected_source or "").lower()
 
         for method in ["rag", "graph", "hybrid"]:
             answer = getattr(qr, f"{method}_answer", "").lower()
 
             # Keyword hit rate
             if expected_keywords and not is_ood:
-                hits = sum(
-                    1 for kw in expected_keywords
-                    if kw.lower() in answer
-                )
+                hits = sum(map(answer.__contains__, keywords_lower))
                 hit_rate = hits / len(expected_keywords)
                 setattr(qr, f"{method}_keyword_hit_rate", hit_rate)
 
@@ -208,7 +311,7 @@ class Evaluator:
             if expected_source and not is_ood:
                 sources = getattr(qr, f"{method}_sources", [])
                 source_match = any(
-                    expected_source.lower() in s.get("document_name", "").lower()
+                    expected_source_lower in s.get("document_name", "").lower()
                     for s in sources
                 )
                 setattr(qr, f"{method}_source_match", source_match)
@@ -230,59 +333,55 @@ class Evaluator:
         if not results:
             return
 
-        n = len(results)
-
-        # Promedios generales
-        for method in ["rag", "graph", "hybrid"]:
-            kw_hits = [getattr(r, f"{method}_keyword_hit_rate") for r in results]
-            confs = [getattr(r, f"{method}_confidence") for r in results]
-            times = [getattr(r, f"{method}_time_ms") for r in results]
-            sources = [getattr(r, f"{method}_source_match") for r in results]
-
-            setattr(report, f"{method}_avg_keyword_hit",
-                    sum(kw_hits) / n if n else 0)
-            setattr(report, f"{method}_avg_confidence",
-                    sum(confs) / n if n else 0)
-            setattr(report, f"{method}_avg_time_ms",
-                    sum(times) / n if n else 0)
-            setattr(report, f"{method}_source_accuracy",
-                    sum(sources) / n if n else 0)
-
-        # Conteo de wins
-        report.rag_wins = sum(1 for r in results if r.best_method == "rag")
-        report.graph_wins = sum(1 for r in results if r.best_method == "graph")
-        report.hybrid_wins = sum(1 for r in results if r.best_method == "hybrid")
-
-        # Por categoría
-        categories = set(r.category for r in results)
-        for cat in categories:
-            cat_results = [r for r in results if r.category == cat]
-            report.results_by_category[cat] = {
-                "count": len(cat_results),
-                "rag_avg_keyword_hit": np.mean(
-                    [r.rag_keyword_hit_rate for r in cat_results]
-                ),
-                "graph_avg_keyword_hit": np.mean(
-                    [r.graph_keyword_hit_rate for r in cat_results]
-                ),
-                "hybrid_avg_keyword_hit": np.mean(
-                    [r.hybrid_keyword_hit_rate for r in cat_results]
-                ),
-            }
-
-        # Por dificultad
-        difficulties = set(r.difficulty for r in results)
-        for diff in difficulties:
-            diff_results = [r for r in results if r.difficulty == diff]
-            report.results_by_difficulty[diff] = {
-                "count": len(diff_results),
-                "rag_avg_keyword_hit": np.mean(
-                    [r.rag_keyword_hit_rate for r in diff_results]
-                ),
-                "hybrid_avg_keyword_hit": np.mean(
-                    [r.hybrid_keyword_hit_rate for r in diff_results]
-                ),
-            }
+        # Promedios generales: una matriz (preguntas × métricas) y un solo
+        # mean por columna
+        columns = [
+            (f"{method}_{field}", f"{method}_{summary}")
+            for method in ["rag", "graph", "hybrid"]
+            for field, summary in [
+                ("keyword_hit_rate", "avg_keyword_hit"),
+                ("confidence", "avg_confidence"),
+                ("time_ms", "avg_time_ms"),
+                ("source_match", "source_accuracy"),
+            ]
+        ]
+        matrix = np.array(
+            [[getattr(r, field) for field, _ in columns] for r in results],
+            dtype=np.float64,
+        )
+        for (_, summary), mean in zip(columns, matrix.mean(axis=0)):
+            setattr(report, summary, float(mean))
+
+        # Conteo de wins (una sola pasada)
+        wins = Counter(r.best_method for r in results)
+        report.rag_wins = wins["rag"]
+        report.graph_wins = wins["graph"]
+        report.hybrid_wins = wins["hybrid"]
+
+        # Por categoría y dificultad: índices de cada grupo en una pasada y
+        # los promedios de keyword hit salen de la misma matriz
+        col_index = {field: i for i, (field, _) in enumerate(columns)}
+
+        def keyword_means_by(attr: str, methods: list[str]) -> dict:
+            groups = defaultdict(list)
+            for idx, r in enumerate(results):
+                groups[getattr(r, attr)].append(idx)
+            cols = [col_index[f"{m}_keyword_hit_rate"] for m in methods]
+            by_group = {}
+            for name, idx in groups.items():
+                # Una fila contigua por método (mismo resultado que np.mean)
+                means = np.ascontiguousarray(matrix[np.ix_(idx, cols)].T).mean(axis=1)
+                by_group[name] = {"count": len(idx)}
+                for method, mean in zip(methods, means):
+                    by_group[name][f"{method}_avg_keyword_hit"] = mean
+            return by_group
+
+        report.results_by_category.update(
+            keyword_means_by("category", ["rag", "graph", "hybrid"])
+        )
+        report.results_by_difficulty.update(
+            keyword_means_by("difficulty", ["rag", "hybrid"])
+        )
 
         # RAGAS summary
         for method in ["rag", "graph", "hybrid"]:
@@ -352,35 +451,7 @@ class Evaluator:
             "by_category": report.results_by_category,
             "by_difficulty": report.results_by_difficulty,
             "details": [
-                {
-                    "id": r.question_id,
-                    "question": r.question,
-                    "category": r.category,
-                    "difficulty": r.difficulty,
-                    "best_method": r.best_method,
-                    "rag": {
-                        "answer": r.rag_answer[:300],
-                        "confidence": round(r.rag_confidence, 3),
-                        "keyword_hit_rate": round(r.rag_keyword_hit_rate, 3),
-                        "source_match": r.rag_source_match,
-                        "time_ms": round(r.rag_time_ms, 1),
-                    },
-                    "graph": {
-                        "answer": r.graph_answer[:300],
-                        "confidence": round(r.graph_confidence, 3),
-                        "keyword_hit_rate": round(r.graph_keyword_hit_rate, 3),
-                        "source_match": r.graph_source_match,
-                        "time_ms": round(r.graph_time_ms, 1),
-                    },
-                    "hybrid": {
-                        "answer": r.hybrid_answer[:300],
-                        "confidence": round(r.hybrid_confidence, 3),
-                        "keyword_hit_rate": round(r.hybrid_keyword_hit_rate, 3),
-                        "source_match": r.hybrid_source_match,
-                        "time_ms": round(r.hybrid_time_ms, 1),
-                    },
-                }
-                for r in report.question_results
+                self._question_detail(r) for r in report.question_results
             ],
         }
 
@@ -398,6 +469,38 @@ class Evaluator:
 
         logger.info(f"Reporte guardado en: {report_path}")
 
+    @staticmethod
+    def _question_detail(r: QuestionResult) -> dict:
+        """Resultado de una pregunta tal como se guarda en el reporte."""
+        return {
+            "id": r.question_id,
+            "question": r.question,
+            "category": r.category,
+            "difficulty": r.difficulty,
+            "best_method": r.best_method,
+            "rag": {
+                "answer": r.rag_answer[:300],
+                "confidence": round(r.rag_confidence, 3),
+                "keyword_hit_rate": round(r.rag_keyword_hit_rate, 3),
+                "source_match": r.rag_source_match,
+                "time_ms": round(r.rag_time_ms, 1),
+            },
+            "graph": {
+                "answer": r.graph_answer[:300],
+                "confidence": round(r.graph_confidence, 3),
+                "keyword_hit_rate": round(r.graph_keyword_hit_rate, 3),
+                "source_match": r.graph_source_match,
+                "time_ms": round(r.graph_time_ms, 1),
+            },
+            "hybrid": {
+                "answer": r.hybrid_answer[:300],
+                "confidence": round(r.hybrid_confidence, 3),
+                "keyword_hit_rate": round(r.hybrid_keyword_hit_rate, 3),
+                "source_match": r.hybrid_source_match,
+                "time_ms": round(r.hybrid_time_ms, 1),
+            },
+        }
+
     def print_summary(self, report: EvaluationReport) -> str:
         """Genera resumen legible del reporte."""
         lines = [
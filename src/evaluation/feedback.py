@@ -5,15 +5,20 @@ Recolecta y almacena feedback de usuarios para mejora continua.
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
-import json
 import logging
 import time
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# is_correct / is_complete como enteros: -1 = sin respuesta del usuario
+_TRISTATE = {None: -1, False: 0, True: 1}
+
 
 @dataclass
 class FeedbackEntry:
@@ -60,9 +65,12 @@ class FeedbackCollector:
     """Recolector y analizador de feedback de usuarios."""
 
     def __init__(self, storage_path: Optional[Path] = None):
-        self.storage_path = storage_path or Path("data/evaluation/feedback.json")
+        self.storage_path = storage_path or Path("data/evaluation/feedback.jsonl")
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
         self._entries: list[FeedbackEntry] = []
+        # Columnas numéricas de _entries (ver _columns), con la cantidad de
+        # entradas con la que se armaron
+        self._columns_cache: Optional[tuple[int, dict]] = None
         self._load()
 
     def submit_feedback(
@@ -96,7 +104,7 @@ class FeedbackCollector:
             sources_count=sources_count,
         )
         self._entries.append(entry)
-        self._save()
+        self._append(entry)
 
         logger.info(
             f"Feedback registrado: rating={entry.rating}, "
@@ -112,47 +120,41 @@ class FeedbackCollector:
             return stats
 
         entries = self._entries
-        n = len(entries)
+        cols = self._columns()
+        rating = cols["rating"]
+        confidence = cols["confidence"]
 
         # Promedios
-        stats.avg_rating = sum(e.rating for e in entries) / n
-        stats.avg_confidence = sum(e.confidence for e in entries) / n
-
-        correct_entries = [e for e in entries if e.is_correct is not None]
-        if correct_entries:
-            stats.correct_rate = (
-                sum(1 for e in correct_entries if e.is_correct)
-                / len(correct_entries)
-            )
-
-        complete_entries = [e for e in entries if e.is_complete is not None]
-        if complete_entries:
-            stats.complete_rate = (
-                sum(1 for e in complete_entries if e.is_complete)
-                / len(complete_entries)
-            )
-
-        # Por método
-        methods = set(e.method for e in entries)
-        for method in methods:
-            method_entries = [e for e in entries if e.method == method]
-            m_n = len(method_entries)
+        stats.avg_rating = float(rating.mean())
+        stats.avg_confidence = float(confidence.mean())
+
+        # Booleanos opcionales (ver _TRISTATE)
+        for name, attr in [("is_correct", "correct_rate"), ("is_complete", "complete_rate")]:
+            answered = int(np.count_nonzero(cols[name] >= 0))
+            if answered:
+                setattr(stats, attr, int(np.count_nonzero(cols[name] == 1)) / answered)
+
+        # Por método: conteos y sumas por id de método en una pasada cada una
+        method_ids = cols["method_id"]
+        n_methods = len(cols["methods"])
+        counts = np.bincount(method_ids, minlength=n_methods)
+        rating_sums = np.bincount(method_ids, weights=rating, minlength=n_methods)
+        conf_sums = np.bincount(method_ids, weights=confidence, minlength=n_methods)
+        for i, method in enumerate(cols["methods"]):
             stats.by_method[method] = {
-                "count": m_n,
-                "avg_rating": sum(e.rating for e in method_entries) / m_n,
-                "avg_confidence": sum(e.confidence for e in method_entries) / m_n,
+                "count": int(counts[i]),
+                "avg_rating": float(rating_sums[i] / counts[i]),
+                "avg_confidence": float(conf_sums[i] / counts[i]),
             }
 
-        # Por rating
+        # Por rating (los ratings de submit_feedback están en 1-5)
+        histogram = np.bincount(np.clip(rating, 0, None), minlength=6)
         for r in range(1, 6):
-            count = sum(1 for e in entries if e.rating == r)
-            stats.by_rating[str(r)] = count
+            stats.by_rating[str(r)] = int(histogram[r])
 
-        # Preguntas con peor rating
-        low_rated = sorted(
-            [e for e in entries if e.rating <= 2],
-            key=lambda e: e.rating,
-        )
+        # Preguntas con peor rating (orden estable, como sorted)
+        low_idx = np.flatnonzero(rating <= 2)
+        low_idx = low_idx[np.argsort(rating[low_idx], kind="stable")]
         stats.low_rated_questions = [
             {
                 "question": e.question,
@@ -161,7 +163,7 @@ class FeedbackCollector:
                 "confidence": e.confidence,
                 "comment": e.user_comment,
             }
-            for e in low_rated[:10]
+            for e in (entries[i] for i in low_idx[:10])
         ]
 
         # Sugerencias de mejora
@@ -169,6 +171,54 @@ class FeedbackCollector:
 
         return stats
 
+    def _columns(self) -> dict:
+        """Vista por columnas (arrays NumPy) de las entradas para agregar.
+
+        Las entradas solo se agregan: se extienden las columnas ya armadas
+        con las entradas nuevas, recorridas en una sola pasada.
+        """
+        entries = self._entries
+        n = len(entries)
+        if self._columns_cache is None:
+            done, cols = 0, {
+                "rating": np.empty(0, np.int64),
+                "confidence": np.empty(0, np.float64),
+                "method_id": np.empty(0, np.int64),
+                "is_correct": np.empty(0, np.int8),
+                "is_complete": np.empty(0, np.int8),
+                "methods": [],
+            }
+        else:
+            done, cols = self._columns_cache
+        if done == n:
+            return cols
+
+        method_index = {m: i for i, m in enumerate(cols["methods"])}
+        ratings, confidences, method_ids, correct, complete = [], [], [], [], []
+        for e in entries[done:n]:
+            ratings.append(e.rating)
+            confidences.append(e.confidence)
+            method_ids.append(method_index.setdefault(e.method, len(method_index)))
+            correct.append(_TRISTATE[e.is_correct])
+            complete.append(_TRISTATE[e.is_complete])
+
+        cols = {
+            "rating": np.concatenate([cols["rating"], np.array(ratings, np.int64)]),
+            "confidence": np.concatenate(
+                [cols["confidence"], np.array(confidences, np.float64)]
+            ),
+            "method_id": np.concatenate(
+                [cols["method_id"], np.array(method_ids, np.int64)]
+            ),
+            "is_correct": np.concatenate([cols["is_correct"], np.array(correct, np.int8)]),
+            "is_complete": np.concatenate(
+                [cols["is_complete"], np.array(complete, np.int8)]
+            ),
+            "methods": list(method_index),
+        }
+        self._columns_cache = (n, cols)
+        return cols
+
     def get_entries(
         self,
         session_id: Optional[str] = None,
@@ -250,20 +300,71 @@ class FeedbackCollector:
 
         return suggestions
 
-    def _save(self) -> None:
-        """Guarda feedback en archivo JSON."""
-        data = [asdict(e) for e in self._entries]
-        with open(self.storage_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def compact(self) -> None:
+        """Reescribe el archivo completo (una línea por entrada).
+
+        Se escribe a un temporal y se reemplaza, para no dejar el archivo a
+        medias si el proceso se corta.
+        """
+        tmp_path = self.storage_path.with_name(self.storage_path.name + ".tmp")
+        tmp_path.write_bytes(
+            b"".join(orjson.dumps(e) + b"\n" for e in self._entries)
+        )
+        tmp_path.replace(self.storage_path)
+
+    def _append(self, entry: FeedbackEntry) -> None:
+        """Agrega una entrada al final del archivo JSONL (sin reescribirlo)."""
+        # orjson serializa el dataclass directamente (sin asdict)
+        with open(self.storage_path, "ab") as f:
+            f.write(orjson.dumps(entry) + b"\n")
 
     def _load(self) -> None:
-        """Carga feedback desde archivo JSON."""
-        if self.storage_path.exists():
+        """Carga feedback desde archivo JSONL.
+
+        También lee el formato anterior (un array JSON, en `feedback.json`)
+        y lo reescribe como JSONL.
+        """
+        path = self.storage_path
+        legacy = not path.exists()
+        if legacy:
+            path = path.with_suffix(".json")
+            if path == self.storage_path or not path.exists():
+                return
+
+        raw = path.read_bytes()
+        invalid_lines = 0
+        if raw.lstrip().startswith(b"["):
+            legacy = True
             try:
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                self._entries = [FeedbackEntry(**d) for d in data]
-                logger.info(f"Cargadas {len(self._entries)} entradas de feedback")
-            except (json.JSONDecodeError, TypeError) as e:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError as e:
                 logger.warning(f"Error cargando feedback: {e}")
-                self._entries = []
+                return
+        else:
+            data = []
+            for line_num, line in enumerate(raw.splitlines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    data.append(orjson.loads(line))
+                except orjson.JSONDecodeError as e:
+                    # Típicamente una última línea cortada por una escritura
+                    # interrumpida
+                    logger.warning(f"Línea {line_num} de feedback inválida: {e}")
+                    invalid_lines += 1
+
+        try:
+            self._entries = [FeedbackEntry(**d) for d in data]
+        except TypeError as e:
+            logger.warning(f"Error cargando feedback: {e}")
+            self._entries = []
+            return
+        self._columns_cache = None
+        logger.info(f"Cargadas {len(self._entries)} entradas de feedback")
+
+        if legacy:
+            logger.info(f"Migrando feedback de {path.name} a JSONL: {self.storage_path}")
+            self.compact()
+        elif invalid_lines:
+            # Sin la línea cortada, los appends siguientes no quedan pegados a ella
+            self.compact()
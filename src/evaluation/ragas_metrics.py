@@ -5,14 +5,33 @@ Implementa faithfulness, answer relevance y context precision sin dependencias e
 Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
+import hashlib
 import logging
 import re
 from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
 
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Datos verificables de un claim (números, siglas, emails) y fin de oración
+_NUMBER_RE = re.compile(r"\d+")
+_ACRONYM_RE = re.compile(r"\b[A-Z]{2,}\b")
+_EMAIL_RE = re.compile(r"[\w.]+@[\w.]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Subir al cambiar cómo se calcula alguna métrica: invalida resultados cacheados
+METRICS_VERSION = 1
+
+# Frases con las que el sistema se abstiene de responder
+_ABSTENTION_PHRASES = (
+    "no tengo información", "no encontré", "fuera del alcance",
+    "no puedo responder", "contactar a",
+)
+
 
 @dataclass
 class RAGASResult:
@@ -29,9 +48,21 @@ class RAGASResult:
 class RAGASEvaluator:
     """Evaluador basado en métricas RAGAS usando embeddings y heurísticas."""
 
-    def __init__(self, embedding_model=None, llm_provider=None):
+    def __init__(
+        self,
+        embedding_model=None,
+        llm_provider=None,
+        embedding_cache_path: Optional[Path] = None,
+    ):
         self.embedding_model = embedding_model
         self.llm = llm_provider
+        # Embeddings ya calculados (digest del texto -> vector). Con
+        # `embedding_cache_path` se persisten entre corridas (.npz); al guardar
+        # se descartan los que esta corrida no usó
+        self.embedding_cache_path = embedding_cache_path
+        self._embedding_cache: dict[bytes, np.ndarray] = self._load_embedding_cache()
+        self._used_keys: set[bytes] = set()
+        self._persisted = len(self._embedding_cache)  # entradas en disco
 
     def evaluate(
         self,
@@ -43,8 +74,12 @@ class RAGASEvaluator:
     ) -> RAGASResult:
         """Evalúa una respuesta con métricas RAGAS."""
         result = RAGASResult(question=question)
+        # Contexto unido en minúscula, compartido por faithfulness y recall
+        context_full = " ".join(contexts).lower()
 
-        result.faithfulness = self._compute_faithfulness(answer, contexts)
+        result.faithfulness = self._compute_faithfulness(
+            answer, contexts, context_full
+        )
         result.answer_relevance = self._compute_answer_relevance(
             question, answer
         )
@@ -52,7 +87,7 @@ class RAGASEvaluator:
             question, contexts
         )
         result.context_recall = self._compute_context_recall(
-            answer, contexts, ground_truth, expected_keywords or []
+            answer, contexts, ground_truth, expected_keywords or [], context_full
         )
 
         # Score global ponderado
@@ -65,6 +100,20 @@ class RAGASEvaluator:
 
         return result
 
+    def evaluate_many(self, inputs: list[dict]) -> list[RAGASResult]:
+        """Evalúa varias respuestas (cada dict son los argumentos de `evaluate`).
+
+        Con modelo de embeddings, todos los textos distintos que no estén en
+        la caché se codifican en una sola llamada a `embed_texts` en vez de
+        varias por respuesta.
+        """
+        if self.embedding_model:
+            added = self._prime_embeddings(inputs)
+            # Guardar si hay textos nuevos o si cambió el subconjunto usado
+            if added or len(self._used_keys) != self._persisted:
+                self._save_embedding_cache()
+        return [self.evaluate(**item) for item in inputs]
+
     def evaluate_batch(
         self, qa_pairs: list[dict], results_data: list[dict]
     ) -> dict:
@@ -74,16 +123,16 @@ class RAGASEvaluator:
             qa_pairs: Lista de dicts con 'question', 'expected_answer', 'expected_keywords'
             results_data: Lista de dicts con 'answer', 'contexts' (textos de los chunks)
         """
-        all_results = []
-        for qa, res in zip(qa_pairs, results_data):
-            ragas = self.evaluate(
-                question=qa["question"],
-                answer=res.get("answer", ""),
-                contexts=res.get("contexts", []),
-                ground_truth=qa.get("expected_answer", ""),
-                expected_keywords=qa.get("expected_keywords", []),
-            )
-            all_results.append(ragas)
+        all_results = self.evaluate_many([
+            {
+                "question": qa["question"],
+                "answer": res.get("answer", ""),
+                "contexts": res.get("contexts", []),
+                "ground_truth": qa.get("expected_answer", ""),
+                "expected_keywords": qa.get("expected_keywords", []),
+            }
+            for qa, res in zip(qa_pairs, results_data)
+        ])
 
         # Agregar métricas
         n = len(all_results) or 1
@@ -99,7 +148,12 @@ class RAGASEvaluator:
 
     # ── Faithfulness ─────────────────────────────────────────────
 
-    def _compute_faithfulness(self, answer: str, contexts: list[str]) -> float:
+    def _compute_faithfulness(
+        self,
+        answer: str,
+        contexts: list[str],
+        context_full: Optional[str] = None,
+    ) -> float:
         """Mide qué porcentaje de claims en la respuesta están respaldados por el contexto.
 
         Faithfulness = |claims respaldados| / |total claims|
@@ -111,25 +165,20 @@ class RAGASEvaluator:
         if not claims:
             return 0.5
 
-        context_full = " ".join(contexts).lower()
-
         if self.embedding_model:
             return self._faithfulness_embeddings(claims, contexts)
 
+        if context_full is None:
+            context_full = " ".join(contexts).lower()
+
         # Heurística: verificar presencia de datos clave en contexto
         supported = 0
+        context_words = None
         for claim in claims:
-            claim_lower = claim.lower()
-
             # Extraer datos específicos del claim (números, nombres propios, emails)
-            data_tokens = set()
-            data_tokens.update(re.findall(r"\d+", claim))
-            data_tokens.update(
-                re.findall(r"\b[A-Z]{2,}\b", claim)
-            )  # Siglas
-            data_tokens.update(
-                re.findall(r"[\w.]+@[\w.]+", claim)
-            )  # Emails
+            data_tokens = set(_NUMBER_RE.findall(claim))
+            data_tokens.update(_ACRONYM_RE.findall(claim))  # Siglas
+            data_tokens.update(_EMAIL_RE.findall(claim))  # Emails
 
             if data_tokens:
                 matched = sum(1 for t in data_tokens if t.lower() in context_full)
@@ -137,8 +186,10 @@ class RAGASEvaluator:
                     supported += 1
             else:
                 # Sin datos específicos: overlap de palabras
-                claim_words = set(claim_lower.split()) - _STOPWORDS_ES
-                context_words = set(context_full.split())
+                claim_words = _content_words(claim)
+                if context_words is None:
+                    # Mismas palabras que context_full.split(), una vez por respuesta
+                    context_words = frozenset().union(*map(_words, contexts))
                 if claim_words:
                     overlap = len(claim_words & context_words) / len(claim_words)
                     if overlap >= 0.4:
@@ -150,14 +201,12 @@ class RAGASEvaluator:
         self, claims: list[str], contexts: list[str]
     ) -> float:
         """Faithfulness usando similitud de embeddings."""
-        claim_embs = self.embedding_model.embed_texts(claims)
-        ctx_embs = self.embedding_model.embed_texts(contexts)
+        claim_embs = np.asarray(self._embed_texts(claims))
+        ctx_embs = np.asarray(self._embed_texts(contexts))
 
-        supported = 0
-        for i in range(len(claims)):
-            similarities = np.dot(claim_embs[i], ctx_embs.T)
-            if float(np.max(similarities)) > 0.60:
-                supported += 1
+        # Todas las similitudes claim × contexto en un solo matmul
+        similarities = claim_embs @ ctx_embs.T
+        supported = int(np.count_nonzero(similarities.max(axis=1) > 0.60))
 
         return supported / len(claims)
 
@@ -172,22 +221,18 @@ class RAGASEvaluator:
             return 0.0
 
         # Penalizar respuestas que se abstienen
-        abstention_phrases = [
-            "no tengo información", "no encontré", "fuera del alcance",
-            "no puedo responder", "contactar a",
-        ]
-        if any(p in answer.lower() for p in abstention_phrases):
+        if self._is_abstention(answer):
             return 0.3  # Score bajo pero no 0 (la abstención puede ser correcta)
 
         if self.embedding_model:
-            q_emb = self.embedding_model.embed_query(question)
-            a_emb = self.embedding_model.embed_query(answer[:500])
+            q_emb = self._embed_query(question)
+            a_emb = self._embed_query(answer[:500])
             similarity = float(np.dot(q_emb, a_emb))
             return max(0.0, min(similarity, 1.0))
 
         # Heurística: overlap de palabras clave
-        q_words = set(question.lower().split()) - _STOPWORDS_ES
-        a_words = set(answer.lower().split()) - _STOPWORDS_ES
+        q_words = _content_words(question)
+        a_words = _content_words(answer)
         if not q_words:
             return 0.5
         overlap = len(q_words & a_words) / len(q_words)
@@ -206,19 +251,17 @@ class RAGASEvaluator:
             return 0.0
 
         if self.embedding_model:
-            q_emb = self.embedding_model.embed_query(question)
-            ctx_embs = self.embedding_model.embed_texts(
-                [c[:500] for c in contexts]
-            )
+            q_emb = self._embed_query(question)
+            ctx_embs = self._embed_texts([c[:500] for c in contexts])
             similarities = np.dot(ctx_embs, q_emb)
-            relevant = sum(1 for s in similarities if s > 0.35)
+            relevant = int(np.count_nonzero(similarities > 0.35))
             return relevant / len(contexts)
 
         # Heurística
-        q_words = set(question.lower().split()) - _STOPWORDS_ES
+        q_words = _content_words(question)
         relevant = 0
         for ctx in contexts:
-            ctx_words = set(ctx.lower().split())
+            ctx_words = _words(ctx)
             if q_words:
                 overlap = len(q_words & ctx_words) / len(q_words)
                 if overlap >= 0.2:
@@ -233,12 +276,14 @@ class RAGASEvaluator:
         contexts: list[str],
         ground_truth: str,
         expected_keywords: list[str],
+        context_full: Optional[str] = None,
     ) -> float:
         """Mide si el contexto contiene la información necesaria para la respuesta correcta.
 
         Context Recall = |keywords esperados en contexto| / |total keywords|
         """
-        context_full = " ".join(contexts).lower()
+        if context_full is None:
+            context_full = " ".join(contexts).lower()
 
         if expected_keywords:
             found = sum(
@@ -248,7 +293,7 @@ class RAGASEvaluator:
             return found / len(expected_keywords)
 
         if ground_truth and ground_truth != "ABSTAIN":
-            gt_words = set(ground_truth.lower().split()) - _STOPWORDS_ES
+            gt_words = _content_words(ground_truth)
             if gt_words:
                 found = sum(1 for w in gt_words if w in context_full)
                 return found / len(gt_words)
@@ -257,19 +302,117 @@ class RAGASEvaluator:
 
     # ── Utilidades ───────────────────────────────────────────────
 
+    def _prime_embeddings(self, inputs: list[dict]) -> int:
+        """Codifica en un lote los textos que van a pedir las métricas.
+
+        Devuelve cuántos textos nuevos se agregaron a la caché.
+        """
+        texts = []
+        for item in inputs:
+            question = item["question"]
+            answer = item.get("answer", "")
+            contexts = item.get("contexts", [])
+            if answer and contexts:
+                texts.extend(self._extract_claims(answer))
+                texts.extend(contexts)
+            # La relevancia de una abstención no usa embeddings
+            if question and answer and not self._is_abstention(answer):
+                texts.extend([question, answer[:500]])
+            if contexts:
+                texts.append(question)
+                texts.extend(c[:500] for c in contexts)
+
+        return self._cache_embeddings(texts)[1]
+
+    def _cache_embeddings(self, texts: list[str]) -> tuple[list[bytes], int]:
+        """Digests de `texts`, codificando en un lote los que faltan en caché.
+
+        Devuelve también cuántos textos nuevos se agregaron.
+        """
+        cache = self._embedding_cache
+        keys = [_text_key(t) for t in texts]
+        missing = {k: t for k, t in zip(keys, texts) if k not in cache}
+        if missing:
+            embeddings = self.embedding_model.embed_texts(list(missing.values()))
+            cache.update(zip(missing, embeddings))
+        self._used_keys.update(keys)
+        return keys, len(missing)
+
+    def _embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Embeddings de `texts`; solo se codifican los que no están en caché."""
+        keys, _ = self._cache_embeddings(texts)
+        cache = self._embedding_cache
+        return np.stack([cache[k] for k in keys])
+
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Embedding de un texto suelto, desde la caché si está."""
+        key = _text_key(text)
+        cached = self._embedding_cache.get(key)
+        if cached is None:
+            cached = self.embedding_model.embed_query(text)
+            self._embedding_cache[key] = cached
+        self._used_keys.add(key)
+        return cached
+
+    def _load_embedding_cache(self) -> dict[str, np.ndarray]:
+        """Carga la caché de embeddings de disco si es del mismo modelo."""
+        path = self.embedding_cache_path
+        if path is None or self.embedding_model is None or not path.exists():
+            return {}
+        try:
+            with np.load(path) as data:
+                if str(data["model"]) != self._embedding_model_name():
+                    return {}
+                keys = [row.tobytes() for row in data["keys"]]
+                embeddings = data["embeddings"]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Caché de embeddings ilegible, se descarta: {e}")
+            return {}
+        logger.info(f"Cargados {len(keys)} embeddings cacheados de {path.name}")
+        return dict(zip(keys, embeddings))
+
+    def _save_embedding_cache(self) -> None:
+        """Persiste los embeddings usados en esta corrida (si hay `embedding_cache_path`)."""
+        path = self.embedding_cache_path
+        keys = [k for k in self._embedding_cache if k in self._used_keys]
+        if path is None or not keys:
+            return
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                model=np.array(self._embedding_model_name()),
+                # Digests de 16 bytes como filas uint8 (sin padding de strings)
+                keys=np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(
+                    len(keys), _KEY_SIZE
+                ),
+                embeddings=np.stack([self._embedding_cache[k] for k in keys]),
+            )
+        tmp_path.replace(path)
+        self._persisted = len(keys)
+
+    def cache_tag(self) -> str:
+        """Versión de las métricas y modelo: resultados con otro tag no son reusables."""
+        mode = self._embedding_model_name() if self.embedding_model else "heuristic"
+        return f"v{METRICS_VERSION}:{mode}"
+
+    def _embedding_model_name(self) -> str:
+        """Identifica el modelo: embeddings de otro modelo no son reusables."""
+        model = self.embedding_model
+        return str(getattr(model, "model_name", type(model).__name__))
+
+    def _is_abstention(self, answer: str) -> bool:
+        """Si la respuesta declara no tener la información."""
+        answer_lower = answer.lower()
+        return any(p in answer_lower for p in _ABSTENTION_PHRASES)
+
     def _extract_claims(self, text: str) -> list[str]:
         """Extrae claims (oraciones con contenido informativo) de un texto."""
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        claims = []
-        for s in sentences:
-            s = s.strip()
-            if len(s) > 15 and not s.startswith("["):
-                claims.append(s)
-        return claims
+        return list(_split_claims(text))
 
 
 # Stopwords básicas en español para heurísticas
-_STOPWORDS_ES = {
+_STOPWORDS_ES = frozenset({
     "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del",
     "al", "a", "en", "con", "por", "para", "se", "su", "sus", "que",
     "es", "son", "fue", "ser", "no", "sí", "como", "más", "pero",
@@ -277,4 +420,39 @@ _STOPWORDS_ES = {
     "muy", "también", "ya", "o", "u", "y", "e", "lo", "le", "les",
     "me", "te", "nos", "mi", "tu", "qué", "cuál", "cuáles", "cómo",
     "dónde", "cuándo", "cuánto", "cuántos", "hay", "tiene", "tienen",
-}
+})
+
+
+# ── Tokenización cacheada ────────────────────────────────────────
+# Las mismas preguntas, respuestas y contextos se tokenizan varias veces
+# (por métrica, por método y entre preguntas que recuperan los mismos chunks)
+
+_KEY_SIZE = 16
+
+
+def _text_key(text: str) -> bytes:
+    """Clave de la caché de embeddings: blake2b del texto (no el texto)."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=_KEY_SIZE).digest()
+
+
+@lru_cache(maxsize=4096)
+def _split_claims(text: str) -> tuple[str, ...]:
+    """Oraciones de más de 15 caracteres que no son citas ("[...]")."""
+    claims = []
+    for s in _SENTENCE_END_RE.split(text):
+        s = s.strip()
+        if len(s) > 15 and not s.startswith("["):
+            claims.append(s)
+    return tuple(claims)
+
+
+@lru_cache(maxsize=16384)
+def _words(text: str) -> frozenset[str]:
+    """Palabras del texto en minúscula."""
+    return frozenset(text.lower().split())
+
+
+@lru_cache(maxsize=16384)
+def _content_words(text: str) -> frozenset[str]:
+    """Palabras del texto en minúscula, sin stopwords."""
+    return _words(text) - _STOPWORDS_ES
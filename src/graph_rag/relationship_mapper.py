@@ -8,12 +8,25 @@ import re
 import logging
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from itertools import chain
+from typing import Iterable, Iterator, Optional
 
 from src.graph_rag.entity_extractor import Entity, EntityType
 
 logger = logging.getLogger(__name__)
 
+# Patrón: "para X es necesario/se requiere Y"
+REQUIREMENT_PATTERNS = [
+    re.compile(
+        r"para\s+(?:inscribir|cursar|aprobar)\s+(.+?)\s+(?:es necesario|necesit[aá]s?|deb[eé]s?|se requiere)\s+(.+?)(?:\.|$)",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"(?:requisito|condici[oó]n)\s+para\s+(.+?):\s*(.+?)(?:\.|$)",
+        re.IGNORECASE,
+    ),
+]
+
 
 class RelationType(Enum):
     REQUIERE_EGRESO_DE = "requiere_egreso_de"
@@ -78,6 +91,33 @@ class RelationshipMapper:
         logger.info(f"Extraídas {len(relationships)} relaciones de {document_name}")
         return relationships
 
+    def extract_relationships_iter(
+        self,
+        chunks: Iterable,
+        entities: list[Entity],
+    ) -> Iterator[Relationship]:
+        """Versión streaming de `extract_relationships` sobre chunks.
+
+        Aplica las reglas chunk por chunk en lugar de concatenar todo el
+        corpus en un único string. Las relaciones salen ya deduplicadas.
+        """
+        entity_names = self._build_entity_names(entities)
+        candidates = chain(
+            self._get_known_relationships(entities),
+            chain.from_iterable(
+                self._match_requirement_patterns(chunk.text, entity_names)
+                for chunk in chunks
+            ),
+            self._article_relationships(entities),
+        )
+
+        seen = set()
+        for rel in candidates:
+            key = self._relationship_key(rel)
+            if key not in seen:
+                seen.add(key)
+                yield rel
+
     def _get_known_relationships(self, entities: list[Entity]) -> list[Relationship]:
         """Relaciones conocidas del dominio LSE-FIUBA."""
         rels = []
@@ -207,28 +247,26 @@ class RelationshipMapper:
         self, text: str, entities: list[Entity]
     ) -> list[Relationship]:
         """Extracción de relaciones por patrones regex."""
-        rels = []
-
-        # Patrón: "para X es necesario/se requiere Y"
-        req_patterns = [
-            re.compile(
-                r"para\s+(?:inscribir|cursar|aprobar)\s+(.+?)\s+(?:es necesario|necesit[aá]s?|deb[eé]s?|se requiere)\s+(.+?)(?:\.|$)",
-                re.IGNORECASE,
-            ),
-            re.compile(
-                r"(?:requisito|condici[oó]n)\s+para\s+(.+?):\s*(.+?)(?:\.|$)",
-                re.IGNORECASE,
-            ),
-        ]
+        entity_names = self._build_entity_names(entities)
+        rels = list(self._match_requirement_patterns(text, entity_names))
+        rels.extend(self._article_relationships(entities))
+        return rels
 
+    def _build_entity_names(self, entities: list[Entity]) -> dict[str, Entity]:
+        """Índice nombre/alias (en minúsculas) -> entidad."""
         entity_names = {e.name.lower(): e for e in entities}
         for alias_list in [e.aliases for e in entities]:
             for alias in alias_list:
                 matching = [e for e in entities if alias in e.aliases]
                 if matching:
                     entity_names[alias.lower()] = matching[0]
+        return entity_names
 
-        for pattern in req_patterns:
+    def _match_requirement_patterns(
+        self, text: str, entity_names: dict[str, Entity]
+    ) -> Iterator[Relationship]:
+        """Relaciones de requisito detectadas por REQUIREMENT_PATTERNS."""
+        for pattern in REQUIREMENT_PATTERNS:
             for match in pattern.finditer(text):
                 source_text = match.group(1).strip()
                 target_text = match.group(2).strip()
@@ -237,14 +275,16 @@ class RelationshipMapper:
                 target_entity = self._find_entity_in_text(target_text, entity_names)
 
                 if source_entity and target_entity:
-                    rels.append(Relationship(
+                    yield Relationship(
                         source_entity_id=source_entity.entity_id,
                         target_entity_id=target_entity.entity_id,
                         relation_type=RelationType.ES_REQUISITO_PARA,
                         source_text=match.group(0)[:200],
-                    ))
+                    )
 
-        # Patrón: "Art. N regula/establece X"
+    def _article_relationships(self, entities: list[Entity]) -> list[Relationship]:
+        """Patrón: "Art. N regula/establece X"."""
+        rels = []
         for entity in entities:
             if entity.entity_type == EntityType.ARTICULO:
                 content = entity.properties.get("content_preview", "").lower()
@@ -276,8 +316,12 @@ class RelationshipMapper:
         seen = set()
         unique = []
         for rel in relationships:
-            key = (rel.source_entity_id, rel.target_entity_id, rel.relation_type.value)
+            key = self._relationship_key(rel)
             if key not in seen:
                 seen.add(key)
                 unique.append(rel)
         return unique
+
+    @staticmethod
+    def _relationship_key(rel: Relationship) -> tuple[str, str, str]:
+        return (rel.source_entity_id, rel.target_entity_id, rel.relation_type.value)
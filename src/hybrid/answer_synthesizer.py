@@ -51,6 +51,45 @@ class AnswerSynthesizer:
         chat_history: Optional[list[dict]] = None,
     ) -> FinalAnswer:
         """Genera respuesta final desde resultados híbridos."""
+        final, prompt = self._prepare(query, hybrid_result)
+        if prompt is None:
+            return final
+
+        if chat_history:
+            messages = list(chat_history) + [{"role": "user", "content": prompt}]
+            answer_text = self.llm.generate_with_history(
+                messages, system_prompt=SYSTEM_PROMPT_ES
+            )
+        else:
+            answer_text = self.llm.generate(prompt, system_prompt=SYSTEM_PROMPT_ES)
+
+        return self._finalize(query, hybrid_result, final, answer_text)
+
+    def synthesize_batch(
+        self,
+        query: str,
+        hybrid_results: list[HybridResult],
+    ) -> list[FinalAnswer]:
+        """Sintetiza la misma pregunta sobre varios resultados híbridos
+        (p. ej. los tres modos de /chat/compare) con un único batch al LLM."""
+        prepared = [self._prepare(query, hr) for hr in hybrid_results]
+        pending = [i for i, (_, prompt) in enumerate(prepared) if prompt is not None]
+
+        answers = self.llm.generate_batch(
+            [prepared[i][1] for i in pending], system_prompt=SYSTEM_PROMPT_ES
+        )
+
+        finals = [final for final, _ in prepared]
+        for i, answer_text in zip(pending, answers):
+            finals[i] = self._finalize(
+                query, hybrid_results[i], finals[i], answer_text
+            )
+        return finals
+
+    def _prepare(
+        self, query: str, hybrid_result: HybridResult
+    ) -> tuple[FinalAnswer, Optional[str]]:
+        """Arma el prompt para el LLM, o devuelve la abstención (prompt None)."""
         final = FinalAnswer(method=hybrid_result.retrieval_mode.value)
 
         # 1. Verificar si debe abstenerse
@@ -73,9 +112,9 @@ class AnswerSynthesizer:
             final.confidence = 0.0
             final.fallback_contacts = [contact]
             final.formatted_answer = final.answer
-            return final
+            return final, None
 
-        # 2. Generar respuesta con LLM
+        # 2. Armar prompt para el LLM
         if hybrid_result.retrieval_mode == RetrievalMode.HYBRID:
             rag_context = "\n".join(
                 r.text for r in hybrid_result.rag_results
@@ -96,17 +135,19 @@ class AnswerSynthesizer:
                 question=query,
             )
 
-        if chat_history:
-            messages = list(chat_history) + [{"role": "user", "content": prompt}]
-            answer_text = self.llm.generate_with_history(
-                messages, system_prompt=SYSTEM_PROMPT_ES
-            )
-        else:
-            answer_text = self.llm.generate(prompt, system_prompt=SYSTEM_PROMPT_ES)
+        return final, prompt
 
+    def _finalize(
+        self,
+        query: str,
+        hybrid_result: HybridResult,
+        final: FinalAnswer,
+        answer_text: str,
+    ) -> FinalAnswer:
+        """Completa fuentes, verificación, confianza y citas de la respuesta."""
         final.answer = answer_text
 
-        # 3. Extraer fuentes
+        # 3. Extraer fuentes (con las claves de api.schemas.SourceCitation)
         sources = []
         for r in hybrid_result.rag_results:
             sources.append({
@@ -123,6 +164,7 @@ class AnswerSynthesizer:
                     "document_name": entity.get("properties", {}).get(
                         "source_document", "Grafo de conocimiento"
                     ),
+                    "page_numbers": [],
                     "section_title": entity.get("name", ""),
                     "text_snippet": r.subgraph_text[:150] if r.subgraph_text else "",
                     "score": r.confidence,
@@ -87,6 +87,24 @@ class ConversationMemory:
         if len(session["turns"]) > self.window_size * 2:
             self._compress(session_id)
 
+    def prepare_turn(
+        self, session_id: str, question: str
+    ) -> tuple[str, list[dict]]:
+        """Query contextualizada e historial para el LLM, en una sola llamada."""
+        query = self.contextualize_query(session_id, question)
+        return query, self.get_chat_history(session_id)
+
+    def commit_turn(
+        self,
+        session_id: str,
+        user_message: str,
+        assistant_message: str,
+        metadata: dict = None,
+    ) -> None:
+        """Registra la pregunta y la respuesta de un turno completo."""
+        self.add_turn(session_id, "user", user_message)
+        self.add_turn(session_id, "assistant", assistant_message, metadata=metadata)
+
     def get_chat_history(self, session_id: str) -> list[dict]:
         """Obtiene el historial formateado para el LLM."""
         session = self._sessions[session_id]
@@ -10,6 +10,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
+import numpy as np
+
 from src.rag.retriever import RAGRetriever, SearchResult
 from src.graph_rag.graph_retriever import GraphRetriever, GraphSearchResult
 
@@ -53,39 +55,77 @@ class HybridRetriever:
         mode: RetrievalMode = RetrievalMode.HYBRID,
         top_k: int = 5,
         program_filter: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> HybridResult:
         """Recupera información de ambos sistemas."""
+        rag_results = []
+        if mode in (RetrievalMode.RAG_ONLY, RetrievalMode.HYBRID):
+            rag_results = self.retrieve_rag(
+                query, top_k, program_filter, query_embedding=query_embedding
+            )
+
+        graph_results = []
+        if mode in (RetrievalMode.GRAPH_ONLY, RetrievalMode.HYBRID):
+            graph_results = self.retrieve_graph(query, top_k)
+
+        return self.fuse(query, rag_results, graph_results, mode)
+
+    def retrieve_rag(
+        self,
+        query: str,
+        top_k: int = 5,
+        program_filter: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> list[SearchResult]:
+        """Recuperación vectorial (vacía si falla)."""
+        try:
+            return self.rag_retriever.retrieve(
+                query=query,
+                top_k=top_k,
+                use_mmr=True,
+                program_filter=program_filter,
+                query_embedding=query_embedding,
+            )
+        except Exception as e:
+            logger.error(f"Error en RAG retrieval: {e}")
+            return []
+
+    def retrieve_graph(self, query: str, top_k: int = 5) -> list[GraphSearchResult]:
+        """Recuperación sobre el grafo (vacía si falla)."""
+        try:
+            return self.graph_retriever.retrieve(query=query, top_k=top_k)
+        except Exception as e:
+            logger.error(f"Error en Graph retrieval: {e}")
+            return []
+
+    def fuse(
+        self,
+        query: str,
+        rag_results: list[SearchResult],
+        graph_results: list[GraphSearchResult],
+        mode: RetrievalMode = RetrievalMode.HYBRID,
+    ) -> HybridResult:
+        """Arma el HybridResult de `mode` a partir de resultados ya recuperados.
+
+        Permite reutilizar una misma recuperación RAG/Graph para varios modos
+        (p. ej. en /chat/compare). Se descartan las fuentes que `mode` no usa.
+        """
         result = HybridResult(retrieval_mode=mode)
 
         # Clasificar query para ajustar pesos
         adjusted_rag_weight, adjusted_graph_weight = self._adjust_weights(query)
 
-        if mode in (RetrievalMode.RAG_ONLY, RetrievalMode.HYBRID):
-            try:
-                result.rag_results = self.rag_retriever.retrieve(
-                    query=query,
-                    top_k=top_k,
-                    use_mmr=True,
-                    program_filter=program_filter,
-                )
-                if result.rag_results:
-                    result.rag_confidence = sum(
-                        r.score for r in result.rag_results
-                    ) / len(result.rag_results)
-            except Exception as e:
-                logger.error(f"Error en RAG retrieval: {e}")
-
-        if mode in (RetrievalMode.GRAPH_ONLY, RetrievalMode.HYBRID):
-            try:
-                result.graph_results = self.graph_retriever.retrieve(
-                    query=query, top_k=top_k
-                )
-                if result.graph_results:
-                    result.graph_confidence = sum(
-                        r.confidence for r in result.graph_results
-                    ) / len(result.graph_results)
-            except Exception as e:
-                logger.error(f"Error en Graph retrieval: {e}")
+        if mode in (RetrievalMode.RAG_ONLY, RetrievalMode.HYBRID) and rag_results:
+            result.rag_results = list(rag_results)
+            result.rag_confidence = sum(
+                r.score for r in result.rag_results
+            ) / len(result.rag_results)
+
+        if mode in (RetrievalMode.GRAPH_ONLY, RetrievalMode.HYBRID) and graph_results:
+            result.graph_results = list(graph_results)
+            result.graph_confidence = sum(
+                r.confidence for r in result.graph_results
+            ) / len(result.graph_results)
 
         # Merge contexts
         result.merged_context = self._merge_contexts(
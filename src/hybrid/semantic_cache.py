@@ -0,0 +1,127 @@
+"""
+Caché semántica de respuestas del chatbot.
+Sirve la respuesta de una pregunta ya contestada cuando una nueva pregunta
+es casi idéntica (similitud coseno sobre embeddings normalizados).
+
+Autor: Juan Ruiz Otondo - CEIA FIUBA
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheBucket:
+    """Entradas de un mismo (modo, filtro de programa)."""
+    index: faiss.IndexFlatIP
+    embeddings: list[np.ndarray] = field(default_factory=list)
+    payloads: list[Any] = field(default_factory=list)
+
+
+class SemanticCache:
+    """Caché pregunta → respuesta con búsqueda top-1 en FAISS (IndexFlatIP).
+
+    Las entradas se separan por (modo, program_filter): la misma pregunta
+    en otro modo o programa no comparte respuesta. `index_key` identifica el
+    índice con el que se generaron las respuestas: si cambia, la caché se
+    vacía. Al superar `max_entries` se descarta la mitad más vieja del bucket.
+    """
+
+    def __init__(self, threshold: float = 0.97, max_entries: int = 10000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._buckets: dict[tuple, _CacheBucket] = {}
+        self._index_key: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self,
+        query_embedding: np.ndarray,
+        mode: str,
+        program_filter: Optional[str] = None,
+        index_key: Optional[tuple] = None,
+    ) -> Optional[Any]:
+        """Devuelve la respuesta cacheada más similar, o None si no supera el umbral."""
+        vector = self._as_row(query_embedding)
+        with self._lock:
+            self._sync_index(index_key)
+            bucket = self._buckets.get((mode, program_filter))
+            if bucket is None or bucket.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = bucket.index.search(vector, 1)
+            if scores[0][0] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return bucket.payloads[ids[0][0]]
+
+    def insert(
+        self,
+        query_embedding: np.ndarray,
+        payload: Any,
+        mode: str,
+        program_filter: Optional[str] = None,
+        index_key: Optional[tuple] = None,
+    ) -> None:
+        """Agrega una respuesta a la caché."""
+        vector = self._as_row(query_embedding)
+        key = (mode, program_filter)
+        with self._lock:
+            self._sync_index(index_key)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _CacheBucket(index=faiss.IndexFlatIP(vector.shape[1]))
+                self._buckets[key] = bucket
+
+            if bucket.index.ntotal >= self.max_entries:
+                self._evict(bucket)
+
+            bucket.index.add(vector)
+            bucket.embeddings.append(vector[0])
+            bucket.payloads.append(payload)
+
+    def clear(self) -> None:
+        """Vacía la caché (p. ej. al reindexar los documentos)."""
+        with self._lock:
+            self._buckets.clear()
+
+    def _sync_index(self, index_key: Optional[tuple]) -> None:
+        """Vacía la caché si cambió el índice (llamar con el lock tomado)."""
+        if index_key != self._index_key:
+            if self._buckets:
+                logger.info("Índice nuevo: se vacía la caché semántica")
+            self._buckets.clear()
+            self._index_key = index_key
+
+    def __len__(self) -> int:
+        return sum(b.index.ntotal for b in self._buckets.values())
+
+    @staticmethod
+    def _as_row(embedding: np.ndarray) -> np.ndarray:
+        """Vector (1, dim) float32 contiguo y normalizado, como espera FAISS."""
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    @staticmethod
+    def _evict(bucket: _CacheBucket) -> None:
+        """Descarta la mitad más vieja del bucket y reconstruye su índice."""
+        keep = len(bucket.payloads) // 2
+        logger.info(f"Caché semántica llena: se conservan {keep} entradas")
+        bucket.embeddings = bucket.embeddings[-keep:] if keep else []
+        bucket.payloads = bucket.payloads[-keep:] if keep else []
+        bucket.index.reset()
+        if bucket.embeddings:
+            bucket.index.add(np.vstack(bucket.embeddings))
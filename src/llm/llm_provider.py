@@ -5,6 +5,7 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from typing import Optional
 
@@ -78,6 +79,28 @@ class LLMProvider:
 
         return self._call_llm(full_messages)
 
+    def generate_batch(
+        self, prompts: list[str], system_prompt: Optional[str] = None
+    ) -> list[str]:
+        """Genera texto para varios prompts en una sola llamada.
+
+        Ni Ollama ni la API de chat de OpenAI aceptan varios prompts por
+        request, así que los prompts únicos se envían en paralelo sobre el
+        mismo cliente; los repetidos se generan una sola vez.
+        """
+        unique = list(dict.fromkeys(prompts))
+        if not unique:
+            return []
+        if len(unique) == 1:
+            answers = [self.generate(unique[0], system_prompt=system_prompt)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(unique)) as executor:
+                answers = list(executor.map(
+                    lambda p: self.generate(p, system_prompt=system_prompt), unique
+                ))
+        by_prompt = dict(zip(unique, answers))
+        return [by_prompt[p] for p in prompts]
+
     def _call_llm(self, messages: list[dict]) -> str:
         """Llama al LLM según el backend configurado."""
         if self.backend == LLMBackend.OLLAMA:
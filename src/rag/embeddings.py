@@ -41,16 +41,28 @@ class EmbeddingModel:
             self.embedding_dim = self._model.get_sentence_embedding_dimension()
             logger.info(f"Modelo cargado. Dimensiones: {self.embedding_dim}")
 
-    def embed_texts(self, texts: list[str]) -> np.ndarray:
-        """Codifica una lista de textos en vectores densos."""
+    def embed_texts(
+        self,
+        texts: list[str],
+        batch_size: Optional[int] = None,
+        show_progress_bar: Optional[bool] = None,
+    ) -> np.ndarray:
+        """Codifica una lista de textos en vectores densos.
+
+        Los vectores salen normalizados L2. Para indexación masiva conviene
+        pasar un `batch_size` mayor al default (p. ej. 128).
+        """
         self._load_model()
+        if show_progress_bar is None:
+            show_progress_bar = len(texts) > 100
         embeddings = self._model.encode(
             texts,
-            batch_size=self.batch_size,
-            show_progress_bar=len(texts) > 100,
+            batch_size=batch_size or self.batch_size,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=True,
             normalize_embeddings=True,  # Para cosine similarity con inner product
         )
-        return np.array(embeddings, dtype=np.float32)
+        return np.asarray(embeddings, dtype=np.float32)
 
     def embed_query(self, query: str) -> np.ndarray:
         """Codifica una query individual."""
@@ -7,6 +7,8 @@ Autor: Juan Ruiz Otondo - CEIA FIUBA
 import logging
 from typing import Optional
 
+import numpy as np
+
 from src.rag.embeddings import EmbeddingModel
 from src.rag.vector_store import FAISSVectorStore, SearchResult
 
@@ -70,10 +72,15 @@ class RAGRetriever:
         use_mmr: bool = True,
         program_filter: Optional[str] = None,
         rerank: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> list[SearchResult]:
-        """Pipeline completo de retrieval."""
+        """Pipeline completo de retrieval.
+
+        `query_embedding` evita recalcular el embedding si el caller ya lo tiene.
+        """
         # 1. Embed query
-        query_embedding = self.embedding_model.embed_query(query)
+        if query_embedding is None:
+            query_embedding = self.embedding_model.embed_query(query)
 
         # 2. Búsqueda FAISS
         fetch_k = top_k * 4 if rerank else top_k
@@ -174,10 +174,10 @@ with tab_feedback:
             "Asegurate de que la API esté corriendo."
         )
         # Intentar cargar desde archivo
-        feedback_path = ROOT / "data" / "evaluation" / "feedback.json"
+        feedback_path = ROOT / "data" / "evaluation" / "feedback.jsonl"
         if feedback_path.exists():
             with open(feedback_path, "r", encoding="utf-8") as f:
-                entries = json.load(f)
+                entries = [json.loads(line) for line in f if line.strip()]
             st.info(f"Cargadas {len(entries)} entradas de feedback desde archivo.")
             if entries:
                 avg_rating = sum(e.get("rating", 0) for e in entries) / len(entries)
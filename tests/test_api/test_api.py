@@ -74,3 +74,173 @@ class TestHealthEndpoint:
         )
         assert health.status == "ok"
         assert health.documents_loaded == 13
+
+    def test_health_reuses_recent_llm_probe(self):
+        from types import SimpleNamespace
+
+        from fastapi.testclient import TestClient
+
+        from src.api.main import app
+        from src.api.dependencies import get_dependencies
+
+        probes = []
+
+        def is_available():
+            probes.append(1)
+            return True
+
+        deps = SimpleNamespace(
+            llm_provider=SimpleNamespace(is_available=is_available),
+            pipeline=SimpleNamespace(get_all_metadata=lambda: [{}, {}]),
+            vector_store=None,
+            graph_builder=None,
+        )
+        app.dependency_overrides[get_dependencies] = lambda: deps
+        try:
+            client = TestClient(app)
+            responses = [client.get("/api/v1/health").json() for _ in range(3)]
+        finally:
+            app.dependency_overrides.clear()
+
+        assert responses[0]["llm_available"] is True
+        assert responses[0]["documents_loaded"] == 2
+        assert len(probes) == 1
+
+
+class TestCompareEndpoint:
+    """Tests de /chat/compare con dependencias simuladas."""
+
+    def test_compare_runs_all_modes(self):
+        from types import SimpleNamespace
+
+        from fastapi.testclient import TestClient
+
+        from src.api.main import app
+        from src.api.dependencies import get_dependencies
+        from src.hybrid.answer_synthesizer import FinalAnswer
+        from src.hybrid.hybrid_retriever import HybridResult
+
+        class FakeRetriever:
+            def __init__(self):
+                self.calls = []
+
+            def retrieve_rag(self, query, top_k=5, program_filter=None):
+                self.calls.append("rag")
+                return []
+
+            def retrieve_graph(self, query, top_k=5):
+                self.calls.append("graph")
+                return []
+
+            def fuse(self, query, rag_results, graph_results, mode):
+                return HybridResult(retrieval_mode=mode)
+
+        class FakeSynthesizer:
+            def synthesize_batch(self, query, hybrid_results):
+                return [
+                    FinalAnswer(
+                        answer=f"respuesta {hr.retrieval_mode.value}",
+                        confidence=0.5,
+                        sources=[{"document_name": "CEIA.pdf", "score": 0.7}],
+                    )
+                    for hr in hybrid_results
+                ]
+
+        deps = SimpleNamespace(
+            hybrid_retriever=FakeRetriever(),
+            answer_synthesizer=FakeSynthesizer(),
+        )
+        app.dependency_overrides[get_dependencies] = lambda: deps
+        try:
+            client = TestClient(app)
+            resp = client.post(
+                "/api/v1/chat/compare", json={"question": "¿Qué es la CEIA?"}
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["rag_answer"]["answer"] == "respuesta rag_only"
+        assert data["graph_answer"]["method"] == "graph"
+        assert data["hybrid_answer"]["sources"][0]["document_name"] == "CEIA.pdf"
+        # Cada recuperación se hace una sola vez para los tres modos
+        assert sorted(deps.hybrid_retriever.calls) == ["graph", "rag"]
+
+
+class TestChatSemanticCache:
+    """Tests de la caché semántica en /chat."""
+
+    def test_repeated_question_skips_pipeline(self):
+        from types import SimpleNamespace
+
+        import numpy as np
+        from fastapi.testclient import TestClient
+
+        from src.api.main import app
+        from src.api.dependencies import get_dependencies
+        from src.hybrid.answer_synthesizer import FinalAnswer
+        from src.hybrid.semantic_cache import SemanticCache
+
+        calls = []
+
+        class FakeRetriever:
+            def retrieve(self, **kwargs):
+                calls.append(kwargs["query_embedding"])
+
+        class FakeSynthesizer:
+            def synthesize(self, query, hybrid_result, chat_history=None):
+                return FinalAnswer(answer="Dura un año.", confidence=0.8)
+
+        deps = SimpleNamespace(
+            semantic_cache=SemanticCache(),
+            index_key=("faiss_index.bin", 1, 1),
+            embedding_model=SimpleNamespace(embed_query=lambda q: np.ones(8)),
+            conversation_memory=None,
+            query_expander=None,
+            hybrid_retriever=FakeRetriever(),
+            answer_synthesizer=FakeSynthesizer(),
+        )
+        app.dependency_overrides[get_dependencies] = lambda: deps
+        try:
+            client = TestClient(app)
+            answers = [
+                client.post(
+                    "/api/v1/chat", json={"question": "¿Cuánto dura la CEIA?"}
+                ).json()["answer"]
+                for _ in range(2)
+            ]
+        finally:
+            app.dependency_overrides.clear()
+
+        assert answers == ["Dura un año.", "Dura un año."]
+        assert len(calls) == 1
+        # El retriever reutiliza el embedding calculado para la caché
+        assert calls[0] is not None
+        assert deps.semantic_cache.hits == 1
+
+
+class TestSingleFlight:
+    """Tests de la deduplicación de requests concurrentes idénticos."""
+
+    def test_concurrent_duplicates_share_one_run(self):
+        import asyncio
+
+        from src.api.routes.chat import _inflight, _single_flight
+
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "respuesta"
+
+        async def main():
+            return await asyncio.gather(
+                *(_single_flight(("pregunta", "hybrid", None), compute) for _ in range(5))
+            )
+
+        assert asyncio.run(main()) == ["respuesta"] * 5
+        assert len(runs) == 1
+        assert not _inflight
+
@@ -56,6 +56,23 @@ class TestPDFExtractor:
         with pytest.raises(FileNotFoundError):
             self.extractor.extract(Path("/nonexistent/file.pdf"))
 
+    def test_extract_skips_tables_without_table_topics(self, tmp_path, monkeypatch):
+        import fitz
+
+        pdf_path = tmp_path / "FAQ - MIA.pdf"
+        doc = fitz.open()
+        doc.new_page().insert_text((50, 50), "Pregunta frecuente")
+        doc.save(str(pdf_path))
+        doc.close()
+
+        def fail(filepath):
+            raise AssertionError("no debería llamarse a pdfplumber")
+
+        monkeypatch.setattr(self.extractor, "_extract_tables_with_pdfplumber", fail)
+        result = self.extractor.extract(pdf_path, topics=["inscripcion", "plazos"])
+        assert "Pregunta frecuente" in result.raw_text
+        assert result.tables == []
+
 
 class TestTextCleaner:
     """Tests de limpieza de texto."""
@@ -130,6 +147,25 @@ class TestMetadataExtractor:
         assert meta is not None
         assert "CEIA" in meta.program_codes
 
+    def test_extract_topics_expands_accent_variants(self):
+        topics = self.extractor._extract_topics(
+            "La FECHA LIMITE de prórroga del Trabajo Final vence en marzo."
+        )
+        assert topics == ["plazos", "trabajo_final"]
+
+    def test_detected_topics_do_not_leak_into_registry(self):
+        from src.data_pipeline.metadata_extractor import DOCUMENT_REGISTRY
+
+        registry_topics = list(DOCUMENT_REGISTRY["CEIA.pdf"]["topics"])
+        meta = self.extractor.extract_document_metadata(
+            "CEIA.pdf", "Plazo de inscripción a la MIA"
+        )
+        assert meta.topics[: len(registry_topics)] == registry_topics
+        assert {"plazos", "inscripcion"} <= set(meta.topics)
+        assert "MIA" in meta.program_codes
+        assert DOCUMENT_REGISTRY["CEIA.pdf"]["topics"] == registry_topics
+        assert DOCUMENT_REGISTRY["CEIA.pdf"]["program_codes"] == ["CEIA"]
+
 
 class TestIntegration:
     """Tests de integración del pipeline."""
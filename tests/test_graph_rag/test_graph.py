@@ -113,6 +113,33 @@ class TestKnowledgeGraphBuilder:
         assert len(subgraph.nodes()) == 3
 
 
+class TestRelationshipMapper:
+    """Tests del mapeo de relaciones."""
+
+    def test_iter_matches_full_text(self):
+        from types import SimpleNamespace
+        from src.graph_rag.relationship_mapper import RelationshipMapper
+
+        extractor = AcademicEntityExtractor()
+        texts = [
+            "La MIA requiere haber egresado de la CEIA.",
+            "Para cursar TTFA es necesario aprobar GdP.",
+            "Requisito para TTFB: haber aprobado TTFA.",
+        ]
+        entities = []
+        for text in texts:
+            entities.extend(extractor.extract_entities(text, "test.pdf"))
+
+        mapper = RelationshipMapper()
+        expected = mapper.extract_relationships("\n\n".join(texts), entities)
+        streamed = list(mapper.extract_relationships_iter(
+            [SimpleNamespace(text=t) for t in texts], entities
+        ))
+
+        key = RelationshipMapper._relationship_key
+        assert sorted(map(key, streamed)) == sorted(map(key, expected))
+
+
 class TestCommunityDetector:
     """Tests de detección de comunidades."""
 
@@ -54,6 +54,112 @@ class TestHybridRetrieverWeights:
         assert graph_w == 0.4
 
 
+class TestHybridRetrieverFuse:
+    """Tests de la fusión de resultados ya recuperados."""
+
+    def test_fuse_keeps_only_mode_sources(self):
+        from src.rag.retriever import SearchResult
+        from src.graph_rag.graph_retriever import GraphSearchResult
+
+        retriever = HybridRetriever.__new__(HybridRetriever)
+        retriever.rag_weight = 0.6
+        retriever.graph_weight = 0.4
+
+        rag_hits = [SearchResult(chunk_id="c1", text="texto", score=0.8)]
+        graph_hits = [GraphSearchResult(subgraph_text="CEIA -> MIA", confidence=0.6)]
+
+        rag_only = retriever.fuse(
+            "¿Qué es la CEIA?", rag_hits, graph_hits, RetrievalMode.RAG_ONLY
+        )
+        assert rag_only.rag_results and not rag_only.graph_results
+        assert rag_only.graph_confidence == 0.0
+
+        hybrid = retriever.fuse(
+            "¿Qué es la CEIA?", rag_hits, graph_hits, RetrievalMode.HYBRID
+        )
+        assert hybrid.rag_confidence == pytest.approx(0.8)
+        assert hybrid.graph_confidence == pytest.approx(0.6)
+        assert "CEIA -> MIA" in hybrid.merged_context
+
+
+class TestAnswerSynthesizerBatch:
+    """Tests de la síntesis en batch usada por /chat/compare."""
+
+    def test_batch_sends_one_llm_request(self):
+        from src.hybrid.answer_synthesizer import AnswerSynthesizer
+        from src.rag.retriever import SearchResult
+
+        class FakeLLM:
+            def __init__(self):
+                self.batches = []
+
+            def generate_batch(self, prompts, system_prompt=None):
+                self.batches.append(prompts)
+                return [f"respuesta {i}" for i in range(len(prompts))]
+
+        retriever = HybridRetriever.__new__(HybridRetriever)
+        retriever.rag_weight = 0.6
+        retriever.graph_weight = 0.4
+        rag_hits = [SearchResult(chunk_id="c1", text="La CEIA dura un año.", score=0.8)]
+        results = [
+            retriever.fuse("¿Cuánto dura la CEIA?", rag_hits, [], mode)
+            for mode in (RetrievalMode.RAG_ONLY, RetrievalMode.HYBRID)
+        ]
+
+        llm = FakeLLM()
+        finals = AnswerSynthesizer(llm_provider=llm).synthesize_batch(
+            "¿Cuánto dura la CEIA?", results
+        )
+
+        assert len(llm.batches) == 1 and len(llm.batches[0]) == 2
+        assert [f.answer for f in finals] == ["respuesta 0", "respuesta 1"]
+        assert [f.method for f in finals] == ["rag_only", "hybrid"]
+
+
+class TestSemanticCache:
+    """Tests de la caché semántica de respuestas."""
+
+    def test_lookup_by_similarity_mode_and_program(self):
+        import numpy as np
+        from src.hybrid.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.9)
+        question = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        cache.insert(question, "respuesta CEIA", mode="hybrid", program_filter="CEIA")
+
+        near = np.array([0.99, 0.05, 0.0], dtype=np.float32)
+        far = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+        assert cache.lookup(near, "hybrid", "CEIA") == "respuesta CEIA"
+        assert cache.lookup(far, "hybrid", "CEIA") is None
+        assert cache.lookup(question, "rag_only", "CEIA") is None
+        assert cache.lookup(question, "hybrid", "MIA") is None
+
+    def test_evicts_oldest_entries(self):
+        import numpy as np
+        from src.hybrid.semantic_cache import SemanticCache
+
+        cache = SemanticCache(threshold=0.99, max_entries=4)
+        vectors = np.eye(5, dtype=np.float32)
+        for i, v in enumerate(vectors):
+            cache.insert(v, i, mode="rag_only")
+
+        assert len(cache) == 3
+        assert cache.lookup(vectors[0], "rag_only") is None
+        assert cache.lookup(vectors[4], "rag_only") == 4
+
+    def test_new_index_clears_cache(self):
+        import numpy as np
+        from src.hybrid.semantic_cache import SemanticCache
+
+        cache = SemanticCache()
+        question = np.array([1.0, 0.0], dtype=np.float32)
+        cache.insert(question, "vieja", mode="hybrid", index_key=("idx", 1, 10))
+
+        assert cache.lookup(question, "hybrid", index_key=("idx", 1, 10)) == "vieja"
+        assert cache.lookup(question, "hybrid", index_key=("idx", 2, 12)) is None
+        assert len(cache) == 0
+
+
 class TestCitationManager:
     """Tests del gestor de citaciones."""
 